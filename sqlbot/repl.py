@@ -6,6 +6,7 @@ warnings.filterwarnings("ignore", message=".*found in sys.modules.*")
 
 from dotenv import load_dotenv
 import os
+import re
 import sys
 import readline
 import atexit
@@ -342,34 +343,56 @@ def preview_sql_compilation(sql_query):
     except Exception as e:
         return f"Failed to compile query: {str(e)}"
 
+# Operations that modify data or schema, in the order they are reported
+DANGEROUS_SQL_OPERATIONS = (
+    'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER',
+    'TRUNCATE', 'MERGE', 'REPLACE', 'GRANT', 'REVOKE'
+)
+
+# Compiled once at import; analyze_sql_safety runs for every SQL query
+_LINE_COMMENT_RE = re.compile(r'--.*$', re.MULTILINE)
+_SINGLE_QUOTED_RE = re.compile(r"'[^']*'")
+_DOUBLE_QUOTED_RE = re.compile(r'"[^"]*"')
+_WHITESPACE_RE = re.compile(r'\s+')
+DANGEROUS_SQL_RE = re.compile(r'\b(' + '|'.join(DANGEROUS_SQL_OPERATIONS) + r')\b')
+
+def _strip_block_comments(sql):
+    """Remove terminated /* ... */ comments in a single left-to-right pass.
+
+    A lazy regex rescans to the end of the query from every unterminated
+    ``/*``, which is quadratic on hostile input; str.find never backtracks.
+    """
+    parts = []
+    pos = 0
+    while True:
+        start = sql.find('/*', pos)
+        if start == -1:
+            break
+        end = sql.find('*/', start + 2)
+        if end == -1:
+            break
+        parts.append(sql[pos:start])
+        pos = end + 2
+    parts.append(sql[pos:])
+    return ''.join(parts)
+
 def analyze_sql_safety(sql_query):
     """Analyze SQL query for dangerous operations that modify data."""
-    import re
-    
     # Remove comments first
-    normalized_sql = re.sub(r'--.*$', '', sql_query, flags=re.MULTILINE)  # Remove line comments
-    normalized_sql = re.sub(r'/\*.*?\*/', '', normalized_sql, flags=re.DOTALL)  # Remove block comments
+    normalized_sql = _LINE_COMMENT_RE.sub('', sql_query)  # Remove line comments
+    normalized_sql = _strip_block_comments(normalized_sql)  # Remove block comments
     
     # Remove string literals to avoid false positives
     # Handle both single and double quoted strings
-    normalized_sql = re.sub(r"'[^']*'", "''", normalized_sql)  # Remove single-quoted strings
-    normalized_sql = re.sub(r'"[^"]*"', '""', normalized_sql)  # Remove double-quoted strings
+    normalized_sql = _SINGLE_QUOTED_RE.sub("''", normalized_sql)  # Remove single-quoted strings
+    normalized_sql = _DOUBLE_QUOTED_RE.sub('""', normalized_sql)  # Remove double-quoted strings
     
     # Normalize whitespace and case
-    normalized_sql = re.sub(r'\s+', ' ', normalized_sql).strip().upper()
-    
-    # Define dangerous operations
-    dangerous_operations = [
-        'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 
-        'TRUNCATE', 'MERGE', 'REPLACE', 'GRANT', 'REVOKE'
-    ]
+    normalized_sql = _WHITESPACE_RE.sub(' ', normalized_sql).strip().upper()
     
-    found_dangers = []
-    for operation in dangerous_operations:
-        # Look for the operation as a standalone word (not part of another word)
-        pattern = r'\b' + operation + r'\b'
-        if re.search(pattern, normalized_sql):
-            found_dangers.append(operation)
+    # One scan for all operations, reported in DANGEROUS_SQL_OPERATIONS order
+    matched = set(DANGEROUS_SQL_RE.findall(normalized_sql))
+    found_dangers = [operation for operation in DANGEROUS_SQL_OPERATIONS if operation in matched]
     
     return {
         'is_safe': len(found_dangers) == 0,
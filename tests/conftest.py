@@ -5,6 +5,7 @@ import os
 import sys
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add the project root to Python path for imports
 project_root = Path(__file__).parent.parent
@@ -42,6 +43,24 @@ def setup_subprocess_environment(env=None):
     
     return env
 
+@pytest.fixture(scope="session")
+def subprocess_env_base():
+    """Subprocess environment from setup_subprocess_environment(), built once.
+
+    Steps layer their own variables on top with ``{**subprocess_env_base, ...}``
+    rather than mutating the shared dict.
+    """
+    return setup_subprocess_environment()
+
+@pytest.fixture(scope="session")
+def subprocess_timeout():
+    """Seconds a ``python -m sqlbot.repl`` run may take (SQLBOT_TEST_TIMEOUT, default 60).
+
+    Each run pays interpreter startup and the dbt imports, which stretch well
+    past their serial ~8s when xdist workers share a few CPUs.
+    """
+    return float(os.environ.get('SQLBOT_TEST_TIMEOUT', 60))
+
 @pytest.fixture
 def mock_env():
     """Mock environment variables for testing."""
@@ -102,6 +121,11 @@ def qbot_instance(mock_env, mock_database, mock_llm, mock_dbt):
     
     return repl
 
+@pytest.fixture
+def ctx():
+    """Per-scenario state shared between BDD steps."""
+    return SimpleNamespace()
+
 @pytest.fixture
 def cli_runner():
     """Provide a CLI test runner."""
@@ -129,6 +153,49 @@ target-path: "target"
     
     return tmp_path
 
+@pytest.fixture(scope="session")
+def capture_console():
+    """Shared plain-text Rich console writing to an in-memory buffer.
+
+    Returns a ``(console, buffer)`` pair. Console construction probes the
+    terminal, so one is built per session; callers reset the buffer with
+    ``buffer.seek(0); buffer.truncate()`` instead of creating a new one.
+    """
+    from io import StringIO
+    from rich.console import Console
+
+    buffer = StringIO()
+    console = Console(file=buffer, force_terminal=False, color_system=None, width=120)
+    return console, buffer
+
+def _build_logging_llm(console, show_full_history):
+    """Build a LoggingChatOpenAI with history display for step definitions."""
+    from sqlbot.llm_integration import LoggingChatOpenAI
+
+    return LoggingChatOpenAI(
+        console=console,
+        show_history=True,
+        show_full_history=show_full_history,
+        model="gpt-3.5-turbo",
+        api_key="test-key"
+    )
+
+@pytest.fixture(scope="session")
+def llm_full(capture_console):
+    """Shared LoggingChatOpenAI with --full-history behaviour.
+
+    Building the LangChain model is expensive, so it is created once per
+    session and writes to the shared ``capture_console``.
+    """
+    console, _ = capture_console
+    return _build_logging_llm(console, show_full_history=True)
+
+@pytest.fixture(scope="session")
+def llm_regular(capture_console):
+    """Shared LoggingChatOpenAI with regular (truncating) --history behaviour."""
+    console, _ = capture_console
+    return _build_logging_llm(console, show_full_history=False)
+
 @pytest.fixture(autouse=True)
 def reset_readonly_mode():
     """Reset READONLY_MODE to default (True) after each test."""
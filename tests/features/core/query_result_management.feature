@@ -43,6 +43,7 @@ Feature: Query Result Management
     And the result should contain the error message
     And the result should still have timestamp metadata
 
+  @persistence
   Scenario: Query results persist across session reloads
     Given I execute a SQL query "SELECT 'persistent' as data"
     And the result is recorded with index 1
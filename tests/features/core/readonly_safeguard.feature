@@ -27,33 +27,19 @@ Feature: Safeguard Feature
     Then I should see "Safeguard mode ENABLED"
     And I should see "All queries will be checked for dangerous operations"
 
-  Scenario: Block dangerous INSERT operation by default
+  Scenario Outline: Block dangerous <operation> operation by default
     Given I am in the SQLBot REPL
-    When I try to execute "INSERT INTO test_table VALUES (1, 'test')"
+    When I try to execute "<query>"
     Then I should see "Query blocked by safeguard!"
-    And I should see "✖ Query disallowed due to dangerous operations: INSERT"
+    And I should see "✖ Query disallowed due to dangerous operations: <operation>"
     And I should be prompted for override confirmation
 
-  Scenario: Block dangerous DELETE operation by default
-    Given I am in the SQLBot REPL
-    When I try to execute "DELETE FROM test_table WHERE id = 1"
-    Then I should see "Query blocked by safeguard!"
-    And I should see "✖ Query disallowed due to dangerous operations: DELETE"
-    And I should be prompted for override confirmation
-
-  Scenario: Block dangerous UPDATE operation by default
-    Given I am in the SQLBot REPL
-    When I try to execute "UPDATE test_table SET name = 'new' WHERE id = 1"
-    Then I should see "Query blocked by safeguard!"
-    And I should see "✖ Query disallowed due to dangerous operations: UPDATE"
-    And I should be prompted for override confirmation
-
-  Scenario: Block dangerous DROP operation by default
-    Given I am in the SQLBot REPL
-    When I try to execute "DROP TABLE test_table"
-    Then I should see "Query blocked by safeguard!"
-    And I should see "✖ Query disallowed due to dangerous operations: DROP"
-    And I should be prompted for override confirmation
+    Examples:
+      | operation | query                                           |
+      | INSERT    | INSERT INTO test_table VALUES (1, 'test')       |
+      | DELETE    | DELETE FROM test_table WHERE id = 1             |
+      | UPDATE    | UPDATE test_table SET name = 'new' WHERE id = 1 |
+      | DROP      | DROP TABLE test_table                           |
 
   Scenario: Allow safe SELECT operation with safeguard message
     Given I am in the SQLBot REPL
@@ -0,0 +1,173 @@
+"""Persistent SQLBot worker process for subprocess-isolated BDD steps.
+
+Started once per test session with ``python -m tests.qbot_worker``. Each line
+read from stdin is a JSON request ``{"argv": [...], "env": {...}}``; the
+worker runs ``sqlbot.repl.main()`` with those arguments and writes a single
+JSON response line (prefixed with ``RESPONSE_MARKER``) holding ``stdout``,
+``stderr`` and ``returncode``. Interpreter startup and the sqlbot/dbt imports
+are paid once instead of once per scenario.
+"""
+
+import contextlib
+import io
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+from collections import namedtuple
+
+# Prefix for response lines, so stray output written straight to the real
+# stdout (e.g. by dbt log handlers) cannot be mistaken for a response
+RESPONSE_MARKER = '@@SQLBOT-WORKER@@'
+# Written once sqlbot is imported, so startup does not count against a run's timeout
+READY_MARKER = '@@SQLBOT-WORKER-READY@@'
+
+# Result of a SQLBot run, mirroring the fields of subprocess.CompletedProcess
+QbotResult = namedtuple('QbotResult', ['stdout', 'stderr', 'returncode'])
+
+# Module globals that main() mutates from CLI flags; restored after each run
+REPL_FLAG_GLOBALS = (
+    'PREVIEW_MODE', 'READONLY_MODE', 'READONLY_CLI_MODE',
+    'SHOW_HISTORY', 'SHOW_FULL_HISTORY', 'DBT_PROFILE_NAME',
+)
+LLM_FLAG_GLOBALS = ('show_context', 'DBT_PROFILE_NAME', 'DEBUG_MODE')
+
+
+def run_request(request):
+    """Run main() once for a request and return the response dict."""
+    import sqlbot.repl as repl_module
+    import sqlbot.llm_integration as llm_integration
+    import sqlbot.core.dbt_service as dbt_service_module
+
+    saved_globals = [(repl_module, name, getattr(repl_module, name)) for name in REPL_FLAG_GLOBALS]
+    saved_globals += [
+        (llm_integration, name, getattr(llm_integration, name))
+        for name in LLM_FLAG_GLOBALS if hasattr(llm_integration, name)
+    ]
+    saved_env = dict(os.environ)
+    saved_argv = sys.argv
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+    saved_cwd = os.getcwd()
+    try:
+        os.chdir(request.get('cwd', saved_cwd))
+        os.environ.update(request.get('env', {}))
+        dbt_service_module._dbt_service = None
+        sys.argv = ['sqlbot'] + request['argv']
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                repl_module.main()
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception as e:
+                print(f"Worker error: {e}", file=sys.stderr)
+                returncode = 1
+    finally:
+        os.chdir(saved_cwd)
+        sys.argv = saved_argv
+        os.environ.clear()
+        os.environ.update(saved_env)
+        for module, name, value in saved_globals:
+            setattr(module, name, value)
+
+    return {
+        'stdout': stdout.getvalue(),
+        'stderr': stderr.getvalue(),
+        'returncode': returncode,
+    }
+
+
+def serve(stdin=None, stdout=None):
+    """Answer requests from stdin until it is closed."""
+    # Pay for sqlbot's imports, and dbt's lazy ones, before the first request
+    import sqlbot.repl  # noqa: F401
+    from dbt.cli.main import dbtRunner  # noqa: F401
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stdout.write(READY_MARKER + '\n')
+    stdout.flush()
+    for line in stdin:
+        if not line.strip():
+            continue
+        response = run_request(json.loads(line))
+        stdout.write(RESPONSE_MARKER + json.dumps(response) + '\n')
+        stdout.flush()
+
+
+class QbotWorker:
+    """Client for a worker process started with ``python -m tests.qbot_worker``."""
+
+    def __init__(self, env=None):
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m', 'tests.qbot_worker'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=env
+        )
+        # Responses are read on a thread so run() can stop waiting on a hung worker
+        self._responses = queue.Queue()
+        self._ready = threading.Event()
+        # Why the worker can no longer answer, once it has been killed or exited
+        self._dead_reason = None
+        threading.Thread(target=self._read_responses, daemon=True).start()
+
+    def run(self, argv, env=None, timeout=None):
+        """Run SQLBot with ``argv`` in the worker, from the current directory.
+
+        The request is only written once the previous response has been
+        read, so neither side can block on a full pipe. Raises TimeoutError,
+        after killing the worker, if no response arrives within ``timeout``
+        seconds; worker startup is waited out before the clock starts.
+        Once the worker has timed out or exited, every later call raises
+        RuntimeError instead of writing to a dead pipe.
+        """
+        if self._dead_reason:
+            raise RuntimeError(f"SQLBot worker is no longer running: {self._dead_reason}")
+        self._ready.wait()
+        request = {'argv': argv, 'env': env or {}, 'cwd': os.getcwd()}
+        try:
+            self._proc.stdin.write(json.dumps(request) + '\n')
+            self._proc.stdin.flush()
+        except BrokenPipeError:
+            self._dead_reason = f"exited with code {self._proc.wait()}"
+            raise RuntimeError(f"SQLBot worker {self._dead_reason}") from None
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self._proc.kill()
+            self._proc.wait()
+            self._dead_reason = f"killed after not answering within {timeout}s"
+            raise TimeoutError(f"SQLBot worker did not answer within {timeout}s") from None
+        if response is None:
+            self._dead_reason = f"exited with code {self._proc.wait()}"
+            raise RuntimeError(f"SQLBot worker {self._dead_reason}")
+        return QbotResult(**response)
+
+    def _read_responses(self):
+        for line in self._proc.stdout:
+            if line.startswith(RESPONSE_MARKER):
+                self._responses.put(json.loads(line[len(RESPONSE_MARKER):]))
+            elif line.startswith(READY_MARKER):
+                self._ready.set()
+        self._ready.set()
+        self._responses.put(None)
+
+    def close(self):
+        """Stop the worker, killing it if it does not exit promptly."""
+        with contextlib.suppress(BrokenPipeError):
+            self._proc.stdin.close()
+        try:
+            self._proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,103 @@
+"""Profile payloads and YAML helpers shared by the Sakila profile step modules."""
+
+from pathlib import Path
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader, SafeDumper
+
+DBT_DIR = Path('.dbt')
+PROFILES_YML = DBT_DIR / 'profiles.yml'
+
+# Profiles the Given steps start from, serialized once at import
+EXISTING_PROFILES = {
+    'my_postgres_db': {
+        'target': 'dev',
+        'outputs': {
+            'dev': {
+                'type': 'postgres',
+                'host': 'localhost',
+                'user': 'postgres',
+                'password': 'secret',
+                'port': 5432,
+                'dbname': 'mydb'
+            }
+        }
+    },
+    'my_snowflake_db': {
+        'target': 'prod',
+        'outputs': {
+            'prod': {
+                'type': 'snowflake',
+                'account': 'myaccount',
+                'user': 'myuser',
+                'warehouse': 'mywarehouse'
+            }
+        }
+    }
+}
+
+SIMPLE_PROFILES = {
+    'test_profile': {
+        'target': 'dev',
+        'outputs': {
+            'dev': {
+                'type': 'duckdb',
+                'path': 'test.db'
+            }
+        }
+    }
+}
+
+SAMPLE_EXISTING_PROFILES = {
+    'existing_profile': {
+        'target': 'dev',
+        'outputs': {
+            'dev': {
+                'type': 'postgres',
+                'host': 'localhost',
+                'user': 'testuser',
+                'password': 'testpass',
+                'dbname': 'testdb'
+            }
+        }
+    }
+}
+
+STALE_SAKILA_PROFILE = {
+    'Sakila': {
+        'target': 'dev',
+        'outputs': {
+            'dev': {
+                'type': 'sqlite',
+                'threads': 1,
+                'database': 'database',
+                'schema': 'main',
+                'schemas_and_paths': {
+                    'main': '/old/path/to/sakila.db'
+                },
+                'schema_directory': '/old/path/'
+            }
+        }
+    }
+}
+
+EXISTING_PROFILES_YAML = yaml.dump(EXISTING_PROFILES, Dumper=SafeDumper)
+SIMPLE_PROFILES_YAML = yaml.dump(SIMPLE_PROFILES, Dumper=SafeDumper)
+SAMPLE_EXISTING_PROFILES_YAML = yaml.dump(SAMPLE_EXISTING_PROFILES, Dumper=SafeDumper)
+STALE_SAKILA_PROFILE_YAML = yaml.dump(STALE_SAKILA_PROFILE, Dumper=SafeDumper)
+
+
+def write_profiles(path, payload):
+    """Write a profiles.yml payload, creating its directory if needed.
+
+    ``payload`` is either pre-serialized YAML or a profiles mapping to dump.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not isinstance(payload, str):
+        payload = yaml.dump(payload, Dumper=SafeDumper)
+    path.write_text(payload)
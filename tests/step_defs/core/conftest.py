@@ -0,0 +1,68 @@
+"""Fixtures and background steps shared by the core BDD step modules.
+
+The background steps only describe preconditions that the fixtures in
+``tests/conftest.py`` already establish, so they are defined once here
+instead of in every step module whose feature uses them.
+"""
+
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+from pytest_bdd import given
+
+
+@pytest.fixture(scope="session")
+def mock_repl_console():
+    """Stand-in Rich console for REPL testing that records print calls"""
+    calls = []
+    return SimpleNamespace(
+        calls=calls,
+        print=lambda *args, **kwargs: calls.append((args, kwargs)),
+    )
+
+@pytest.fixture(scope="session")
+def mock_subprocess_result():
+    """Subprocess result for testing database errors"""
+    return SimpleNamespace(
+        returncode=1,
+        stdout="Database Error: Table 'nonexistent_table' doesn't exist",
+        stderr="Error: Connection failed",
+    )
+
+@pytest.fixture
+def input_queue(monkeypatch):
+    """Replace builtins.input with a queue of scripted answers.
+
+    Steps append the answers a prompt should receive; once the queue is
+    empty every prompt gets an empty string, which cancels it.
+    """
+    answers = deque()
+    monkeypatch.setattr('builtins.input', lambda *args, **kwargs: answers.popleft() if answers else '')
+    return answers
+
+
+@given('SQLBot is running in interactive mode')
+def qbot_interactive():
+    """Ensure SQLBot is running in interactive mode."""
+    pass
+
+@given('the database is available')
+def database_available():
+    """Ensure database is available."""
+    pass
+
+@given('I am in the SQLBot REPL')
+def in_qbot_repl():
+    """Ensure we're in the SQLBot REPL context."""
+    pass
+
+@given("SQLBot REPL is running")
+def qbot_repl_running():
+    """Set up SQLBot REPL environment"""
+    pass
+
+@given("the database connection is configured")
+def database_connection_configured():
+    """Ensure database connection is set up"""
+    pass
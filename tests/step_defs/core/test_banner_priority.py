@@ -20,12 +20,9 @@ def dbt_configured():
     pass
 
 @when(parsers.parse('I run SQLBot with query "{query}" and flag "{flag}"'))
-def run_qbot_with_query_and_flag(query, flag):
+def run_qbot_with_query_and_flag(query, flag, subprocess_env_base, subprocess_timeout, ctx):
     """Run SQLBot with a specific query and CLI flag."""
-    from tests.conftest import setup_subprocess_environment
-    
-    env = setup_subprocess_environment()
-    env['DBT_PROFILE_NAME'] = 'Sakila'
+    env = {**subprocess_env_base, 'DBT_PROFILE_NAME': 'Sakila'}
     
     cmd = ['python', '-m', 'sqlbot.repl', flag, '--profile', 'Sakila', query]
     
@@ -33,19 +30,16 @@ def run_qbot_with_query_and_flag(query, flag):
         cmd,
         capture_output=True,
         text=True,
-        timeout=15,
+        timeout=subprocess_timeout,
         env=env
     )
     
-    pytest.qbot_result = result
+    ctx.qbot_result = result
 
 @when(parsers.parse('I run SQLBot with query "{query}" and flags "{flags}"'))
-def run_qbot_with_query_and_flags(query, flags):
+def run_qbot_with_query_and_flags(query, flags, subprocess_env_base, subprocess_timeout, ctx):
     """Run SQLBot with a specific query and multiple CLI flags."""
-    from tests.conftest import setup_subprocess_environment
-    
-    env = setup_subprocess_environment()
-    env['DBT_PROFILE_NAME'] = 'Sakila'
+    env = {**subprocess_env_base, 'DBT_PROFILE_NAME': 'Sakila'}
     
     flag_list = flags.split()
     cmd = ['python', '-m', 'sqlbot.repl'] + flag_list + ['--profile', 'Sakila', query]
@@ -54,19 +48,16 @@ def run_qbot_with_query_and_flags(query, flags):
         cmd,
         capture_output=True,
         text=True,
-        timeout=15,
+        timeout=subprocess_timeout,
         env=env
     )
     
-    pytest.qbot_result = result
+    ctx.qbot_result = result
 
 @when('I start SQLBot in interactive mode')
-def start_qbot_interactive():
+def start_qbot_interactive(subprocess_env_base, subprocess_timeout, ctx):
     """Start SQLBot in interactive mode (no query provided)."""
-    from tests.conftest import setup_subprocess_environment
-    
-    env = setup_subprocess_environment()
-    env['DBT_PROFILE_NAME'] = 'Sakila'
+    env = {**subprocess_env_base, 'DBT_PROFILE_NAME': 'Sakila'}
     
     # Use echo to provide input and exit quickly
     # Note: No --textual flag needed since text mode is now the default
@@ -83,20 +74,20 @@ def start_qbot_interactive():
     )
     
     try:
-        stdout, stderr = process.communicate(input='exit\n', timeout=10)
+        stdout, stderr = process.communicate(input='exit\n', timeout=subprocess_timeout)
         result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
-        pytest.qbot_result = result
+        ctx.qbot_result = result
     except subprocess.TimeoutExpired:
         process.kill()
         stdout, stderr = process.communicate()
         result = subprocess.CompletedProcess(cmd, -1, stdout, stderr)
-        pytest.qbot_result = result
+        ctx.qbot_result = result
 
 @then('the banner should be the first output')
-def banner_should_be_first():
+def banner_should_be_first(ctx):
     """Verify the banner appears as the first meaningful output."""
-    output = pytest.qbot_result.stdout
-    stderr = pytest.qbot_result.stderr
+    output = ctx.qbot_result.stdout
+    stderr = ctx.qbot_result.stderr
 
     # Check for unexpected errors in stderr
     if stderr.strip():
@@ -135,15 +126,15 @@ def banner_should_be_first():
             assert False, f"Content appears before banner at line {i+1}: '{line}'"
 
 @then('I should see the "SQLBot CLI" banner')
-def should_see_cli_banner():
+def should_see_cli_banner(ctx):
     """Verify the CLI banner is displayed."""
-    output = pytest.qbot_result.stdout
+    output = ctx.qbot_result.stdout
     assert "SQLBot CLI" in output, "Should show CLI banner for interactive mode"
 
 @then('I should NOT see any banner')
-def should_not_see_any_banner():
+def should_not_see_any_banner(ctx):
     """Verify no banner is displayed in --no-repl mode."""
-    output = pytest.qbot_result.stdout + pytest.qbot_result.stderr
+    output = ctx.qbot_result.stdout + ctx.qbot_result.stderr
     # No banner elements should appear
     assert "SQLBot CLI" not in output, f"No banner should appear in --no-repl mode. Output: {output}"
     assert "Database Query Interface" not in output, f"No banner should appear in --no-repl mode. Output: {output}"
@@ -151,9 +142,9 @@ def should_not_see_any_banner():
     assert "╰" not in output, f"No banner borders should appear in --no-repl mode. Output: {output}"
 
 @then('the output should be minimal')
-def output_should_be_minimal():
+def output_should_be_minimal(ctx):
     """Verify the output is minimal in --no-repl mode (no verbose banner)."""
-    output = pytest.qbot_result.stdout + pytest.qbot_result.stderr
+    output = ctx.qbot_result.stdout + ctx.qbot_result.stderr
     
     # The main point is that the verbose intro banner should not appear
     # We allow query execution output, error messages, mode messages, etc.
@@ -170,15 +161,15 @@ def output_should_be_minimal():
     assert "Exiting (--no-repl mode)" in output, "Should show exit message"
 
 @then('I should see the "Ready for questions." banner')
-def should_see_interactive_banner():
+def should_see_interactive_banner(ctx):
     """Verify the interactive banner is displayed."""
-    output = pytest.qbot_result.stdout
+    output = ctx.qbot_result.stdout
     assert "Ready for questions." in output, "Should show interactive banner"
 
 @then('initialization messages should appear after the banner')
-def init_messages_after_banner():
+def init_messages_after_banner(ctx):
     """Verify initialization messages appear after the banner."""
-    output = pytest.qbot_result.stdout
+    output = ctx.qbot_result.stdout
     lines = output.strip().split('\n')
     
     banner_ended = False
@@ -6,11 +6,6 @@ Tests that database errors are properly captured and made available to the LLM.
 import pytest
 from pytest_bdd import scenarios, given, when, then, parsers
 from unittest.mock import Mock, patch, MagicMock
-import sys
-import os
-
-# Add the project root to Python path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 
 # Load scenarios from feature file
 scenarios('../../features/core/database_error_handling.feature')
@@ -27,6 +22,11 @@ def mock_llm_agent():
     agent.invoke = Mock()
     return agent
 
+@pytest.fixture
+def scenario_state():
+    """Plain per-scenario state recorded by the question steps"""
+    return {}
+
 @pytest.fixture
 def qbot_with_test_db():
     """SQLBot instance configured with test database"""
@@ -60,16 +60,16 @@ def qbot_with_readonly_access():
     pass
 
 @when(parsers.parse('I ask "{question}"'))
-def ask_question(question, mock_llm_agent):
+def ask_question(question, scenario_state):
     """Simulate asking a question to SQLBot"""
     # Store the question for later verification
-    mock_llm_agent.last_question = question
+    scenario_state['last_question'] = question
 
 @when("the LLM generates a query that fails with a database error")
-def llm_generates_failing_query(mock_llm_agent, mock_conversation_history):
+def llm_generates_failing_query(mock_conversation_history):
     """Simulate LLM generating a query that fails"""
     # Mock the database error
-    mock_llm_agent.database_error = "Table 'nonexistent_table' doesn't exist"
+    database_error = "Table 'nonexistent_table' doesn't exist"
     
     # Simulate adding the error to conversation history
     mock_conversation_history.append({
@@ -78,13 +78,13 @@ def llm_generates_failing_query(mock_llm_agent, mock_conversation_history):
     })
     mock_conversation_history.append({
         'role': 'tool',
-        'content': f"Error executing query: {mock_llm_agent.database_error}"
+        'content': f"Error executing query: {database_error}"
     })
 
 @when("the LLM generates invalid SQL that causes a syntax error")
-def llm_generates_invalid_sql(mock_llm_agent, mock_conversation_history):
+def llm_generates_invalid_sql(mock_conversation_history):
     """Simulate LLM generating invalid SQL"""
-    mock_llm_agent.sql_error = "Syntax error near 'INVALID' at line 1"
+    sql_error = "Syntax error near 'INVALID' at line 1"
     
     # Simulate adding the syntax error to conversation history
     mock_conversation_history.append({
@@ -93,83 +93,83 @@ def llm_generates_invalid_sql(mock_llm_agent, mock_conversation_history):
     })
     mock_conversation_history.append({
         'role': 'tool',
-        'content': f"Error executing query: {mock_llm_agent.sql_error}"
+        'content': f"Error executing query: {sql_error}"
     })
 
 @when("the LLM generates a query for the nonexistent table")
-def llm_queries_nonexistent_table(mock_llm_agent):
+def llm_queries_nonexistent_table():
     """Simulate LLM querying a nonexistent table"""
-    mock_llm_agent.table_error = "Table 'table_that_does_not_exist' doesn't exist"
+    table_error = "Table 'table_that_does_not_exist' doesn't exist"
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
         mock_history.append({
             'role': 'tool',
-            'content': f"Database error: {mock_llm_agent.table_error}"
+            'content': f"Database error: {table_error}"
         })
 
 @when("the LLM generates a query with an invalid column name")
-def llm_queries_invalid_column(mock_llm_agent):
+def llm_queries_invalid_column():
     """Simulate LLM querying with invalid column"""
-    mock_llm_agent.column_error = "Column 'nonexistent_column' not found in table 'film'"
+    column_error = "Column 'nonexistent_column' not found in table 'film'"
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
         mock_history.append({
             'role': 'tool',
-            'content': f"Column error: {mock_llm_agent.column_error}"
+            'content': f"Column error: {column_error}"
         })
 
 @when("the LLM generates a DELETE query")
-def llm_generates_delete_query(mock_llm_agent):
+def llm_generates_delete_query():
     """Simulate LLM generating a DELETE query"""
-    mock_llm_agent.permission_error = "Permission denied: DELETE operations not allowed in read-only mode"
+    permission_error = "Permission denied: DELETE operations not allowed in read-only mode"
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
         mock_history.append({
             'role': 'tool',
-            'content': f"Permission error: {mock_llm_agent.permission_error}"
+            'content': f"Permission error: {permission_error}"
         })
 
 @when("the LLM generates a query with multiple errors")
-def llm_generates_multi_error_query(mock_llm_agent):
+def llm_generates_multi_error_query():
     """Simulate LLM generating a query with multiple errors"""
-    mock_llm_agent.multi_errors = [
+    multi_errors = [
         "Table 'wrong_table' doesn't exist",
         "Column 'wrong_column' not found"
     ]
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
-        for error in mock_llm_agent.multi_errors:
+        for error in multi_errors:
             mock_history.append({
                 'role': 'tool',
                 'content': f"Database error: {error}"
             })
 
 @when("the LLM generates another query with remaining errors")
-def llm_generates_another_error_query(mock_llm_agent):
+def llm_generates_another_error_query():
     """Simulate LLM generating another query with errors"""
-    mock_llm_agent.additional_error = "Column 'still_wrong_column' not found"
+    additional_error = "Column 'still_wrong_column' not found"
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
         mock_history.append({
             'role': 'tool',
-            'content': f"Database error: {mock_llm_agent.additional_error}"
+            'content': f"Database error: {additional_error}"
         })
 
 @when("the LLM generates SQL that produces a detailed error message")
-def llm_generates_detailed_error(mock_llm_agent):
+def llm_generates_detailed_error():
     """Simulate LLM generating SQL with detailed error"""
-    mock_llm_agent.detailed_error = "Syntax error at line 2, column 15: Expected ')' but found 'FROM'"
+    detailed_error = "Syntax error at line 2, column 15: Expected ')' but found 'FROM'"
     
     with patch('sqlbot.llm_integration.conversation_history') as mock_history:
         mock_history.append({
             'role': 'tool',
-            'content': f"Detailed SQL error: {mock_llm_agent.detailed_error}"
+            'content': f"Detailed SQL error: {detailed_error}"
         })
 
 @when(parsers.parse('I ask a follow-up question "{question}"'))
-def ask_followup_question(question, mock_llm_agent):
+def ask_followup_question(question, scenario_state):
     """Simulate asking a follow-up question"""
-    mock_llm_agent.followup_question = question
+    scenario_state['followup_question'] = question
 
 @then("the database error should be captured in the conversation history")
 def verify_error_in_conversation_history(mock_llm_agent, mock_conversation_history):
@@ -322,19 +322,19 @@ def verify_llm_references_specific_details():
     pass
 
 @when(parsers.parse('I ask a follow-up question'))
-def ask_generic_followup_question(mock_llm_agent):
+def ask_generic_followup_question(scenario_state):
     """Handle generic follow-up question step"""
-    mock_llm_agent.followup_asked = True
+    scenario_state['followup_asked'] = True
 
 @when(parsers.parse('I ask "{question}"'))
-def ask_specific_question(question, mock_llm_agent):
+def ask_specific_question(question, scenario_state):
     """Handle specific question step"""
-    mock_llm_agent.specific_question = question
+    scenario_state['last_question'] = question
 
 @when("I ask about the error details")
-def ask_about_error_details_when(mock_llm_agent):
+def ask_about_error_details_when(scenario_state):
     """Handle asking about error details"""
-    mock_llm_agent.error_details_asked = True
+    scenario_state['error_details_asked'] = True
 
 @then("the LLM should reference the connection issue")
 def verify_llm_references_connection_issue(mock_llm_agent):
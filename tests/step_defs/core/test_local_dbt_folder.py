@@ -2,44 +2,18 @@
 
 import pytest
 import os
-import tempfile
 import shutil
 from pathlib import Path
-from pytest_bdd import scenarios, given, when, then, parsers
-from unittest.mock import patch, Mock
-import subprocess
+from pytest_bdd import scenarios, given, when, then
+from unittest.mock import patch
 
-from sqlbot.core.config import SQLBotConfig
-from sqlbot.core.dbt_service import get_dbt_service
-from sqlbot.interfaces.banner import get_banner_content, get_interactive_banner_content
+# sqlbot modules are imported inside the steps that use them so collecting
+# this module stays cheap
 
-# Skip BDD scenarios due to pytest teardown issues with temporary directories
-# The functionality is thoroughly tested in tests/integration/test_local_dbt_folder_integration.py
-# scenarios('../../features/core/local_dbt_folder.feature')
+# Load all scenarios from the feature file
+scenarios('../../features/core/local_dbt_folder.feature')
 
-@pytest.fixture(scope="function")
-def temp_project_dir():
-    """Create a temporary project directory for testing."""
-    old_cwd = os.getcwd()
-    temp_dir = tempfile.mkdtemp()
-
-    try:
-        os.chdir(temp_dir)
-        yield temp_dir
-    finally:
-        # Always restore working directory first
-        os.chdir(old_cwd)
-        # Then clean up temp directory
-        try:
-            shutil.rmtree(temp_dir)
-        except (OSError, PermissionError):
-            # If cleanup fails, just log it but don't fail the test
-            pass
-
-@pytest.fixture
-def sample_local_profiles_yml():
-    """Sample profiles.yml content for local .dbt folder."""
-    return """
+SAMPLE_PROFILES_YML = """
 Sakila:
   target: dev
   outputs:
@@ -65,6 +39,53 @@ TestProfile:
       schema_directory: '/tmp/'
 """
 
+# Encoded once so steps can write the file without a text codec pass
+_PROFILES_YML_BYTES = SAMPLE_PROFILES_YML.encode('ascii')
+
+@pytest.fixture(scope="function")
+def temp_project_dir(tmp_path, monkeypatch):
+    """Create a temporary project directory for testing."""
+    # pytest restores the working directory and prunes old tmp_path trees
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path)
+
+@pytest.fixture(scope="session")
+def sample_local_profiles_yml():
+    """Sample profiles.yml content for local .dbt folder."""
+    return SAMPLE_PROFILES_YML
+
+@pytest.fixture(autouse=True)
+def restore_environ():
+    """Undo the DBT_* variables DbtService exports for the scenario's directory."""
+    with patch.dict(os.environ):
+        yield
+
+def _dbt_service(profile):
+    """Build a DbtService for a profile in the current project directory.
+
+    Detection of the local .dbt folder depends on the working directory, so
+    every scenario gets a fresh service for its own temp directory.
+    """
+    from sqlbot.core.config import SQLBotConfig
+    from sqlbot.core.dbt_service import DbtService
+
+    return DbtService(SQLBotConfig.from_env(profile=profile))
+
+@pytest.fixture
+def sakila_dbt_service(temp_project_dir):
+    """DbtService for the Sakila profile, built in the scenario's directory."""
+    return _dbt_service('Sakila')
+
+@pytest.fixture
+def dbt_config_info(sakila_dbt_service):
+    """dbt configuration details for the Sakila service, read once per scenario."""
+    return sakila_dbt_service.get_dbt_config_info()
+
+@pytest.fixture
+def testprofile_dbt_service(temp_project_dir):
+    """DbtService for the TestProfile profile, built in the scenario's directory."""
+    return _dbt_service('TestProfile')
+
 @given('I have SQLBot installed')
 def qbot_installed():
     """SQLBot is installed and importable."""
@@ -87,7 +108,7 @@ def create_local_dbt_folder(temp_project_dir, sample_local_profiles_yml):
     dbt_dir.mkdir(exist_ok=True)
 
     profiles_file = dbt_dir / 'profiles.yml'
-    profiles_file.write_text(sample_local_profiles_yml)
+    profiles_file.write_bytes(_PROFILES_YML_BYTES)
 
     return str(dbt_dir.resolve())
 
@@ -99,21 +120,19 @@ def no_local_dbt_folder(temp_project_dir):
         shutil.rmtree(dbt_dir)
 
 @given('I have a global ~/.dbt/profiles.yml')
-def mock_global_dbt_folder(sample_local_profiles_yml):
+def mock_global_dbt_folder(sample_local_profiles_yml, monkeypatch):
     """Mock global ~/.dbt/profiles.yml."""
-    global_dbt_path = Path.home() / '.dbt' / 'profiles.yml'
     # We'll mock this since we don't want to modify the actual global config
-    with patch('pathlib.Path.home') as mock_home:
-        mock_home_dir = Path('/tmp/fake_home')
-        mock_home.return_value = mock_home_dir
+    mock_home_dir = Path('/tmp/fake_home')
+    monkeypatch.setattr(Path, 'home', staticmethod(lambda: mock_home_dir))
 
-        mock_global_dbt = mock_home_dir / '.dbt'
-        mock_global_dbt.mkdir(parents=True, exist_ok=True)
+    mock_global_dbt = mock_home_dir / '.dbt'
+    mock_global_dbt.mkdir(parents=True, exist_ok=True)
 
-        mock_profiles = mock_global_dbt / 'profiles.yml'
-        mock_profiles.write_text(sample_local_profiles_yml)
+    mock_profiles = mock_global_dbt / 'profiles.yml'
+    mock_profiles.write_bytes(_PROFILES_YML_BYTES)
 
-        yield str(mock_global_dbt)
+    return str(mock_global_dbt)
 
 @given('I have a local .dbt folder with profiles.yml containing profile "TestProfile"')
 def create_local_dbt_with_test_profile(temp_project_dir, sample_local_profiles_yml):
@@ -129,17 +148,15 @@ def create_local_dbt_with_sakila(temp_project_dir, sample_local_profiles_yml):
 
     return create_local_dbt_folder(temp_project_dir, sample_local_profiles_yml)
 
-@when('I start SQLBot')
-def start_sqlbot():
+@when('I start SQLBot', target_fixture='sqlbot_result')
+def start_sqlbot(dbt_config_info):
     """Start SQLBot and capture banner output."""
+    from sqlbot.core.config import SQLBotConfig
+    from sqlbot.interfaces.banner import get_banner_content
+
     # Test the detection function directly
     profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
 
-    # Create config and dbt service to test the full flow
-    config = SQLBotConfig.from_env(profile='Sakila')
-    dbt_service = get_dbt_service(config)
-    dbt_config_info = dbt_service.get_dbt_config_info()
-
     # Generate banner to verify display
     banner_text = get_banner_content(
         profile='Sakila',
@@ -156,14 +173,15 @@ def start_sqlbot():
         'dbt_config_info': dbt_config_info
     }
 
-@when('I start SQLBot with profile "TestProfile"')
-def start_sqlbot_with_profile():
+@when('I start SQLBot with profile "TestProfile"', target_fixture='sqlbot_result')
+def start_sqlbot_with_profile(testprofile_dbt_service):
     """Start SQLBot with specific profile."""
+    from sqlbot.core.config import SQLBotConfig
+    from sqlbot.interfaces.banner import get_banner_content
+
     profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
 
-    config = SQLBotConfig.from_env(profile='TestProfile')
-    dbt_service = get_dbt_service(config)
-    dbt_config_info = dbt_service.get_dbt_config_info()
+    dbt_config_info = testprofile_dbt_service.get_dbt_config_info()
 
     banner_text = get_banner_content(
         profile='TestProfile',
@@ -180,11 +198,10 @@ def start_sqlbot_with_profile():
         'dbt_config_info': dbt_config_info
     }
 
-@when('I execute SQL query "SELECT 1;"')
-def execute_sql_query():
+@when('I execute SQL query "SELECT 1;"', target_fixture='query_result')
+def execute_sql_query(sakila_dbt_service, dbt_config_info):
     """Execute a SQL query using SQLBot."""
-    config = SQLBotConfig.from_env(profile='Sakila')
-    dbt_service = get_dbt_service(config)
+    dbt_service = sakila_dbt_service
 
     # Mock the actual SQL execution since we don't have a real database
     with patch.object(dbt_service, 'execute_query') as mock_execute:
@@ -202,29 +219,23 @@ def execute_sql_query():
         result = dbt_service.execute_query("SELECT 1;")
         return {
             'result': result,
-            'dbt_config_info': dbt_service.get_dbt_config_info()
+            'dbt_config_info': dbt_config_info
         }
 
 @then('I should see "Local .dbt/profiles.yml (detected)" in the banner')
-def check_local_banner_text():
+def check_local_banner_text(sqlbot_result):
     """Verify local .dbt detection is shown in banner."""
-    result = start_sqlbot()
-    assert "Local `.dbt/profiles.yml` (detected)" in result['banner_text']
-    assert result['is_local'] is True
+    assert "Local `.dbt/profiles.yml` (detected)" in sqlbot_result['banner_text']
+    assert sqlbot_result['is_local'] is True
 
 @then('I should see "Global ~/.dbt/profiles.yml" in the banner')
 def check_global_banner_text():
     """Verify global .dbt usage is shown in banner."""
-    # Ensure we're in a clean directory with no local .dbt folder
-    dbt_dir = Path('.dbt')
-    if dbt_dir.exists():
-        shutil.rmtree(dbt_dir)
+    from sqlbot.interfaces.banner import get_banner_content
 
-    # Force fresh detection by creating a new DbtService instance
-    from sqlbot.core.dbt_service import DbtService
-    config = SQLBotConfig.from_env(profile='TestProfile')
-    dbt_service = DbtService(config)
-    dbt_config_info = dbt_service.get_dbt_config_info()
+    # Force fresh detection with a new TestProfile service; the Given
+    # removed any local .dbt folder
+    dbt_config_info = _dbt_service('TestProfile').get_dbt_config_info()
 
     # Generate banner
     banner_text = get_banner_content(
@@ -239,91 +250,78 @@ def check_global_banner_text():
     assert dbt_config_info['is_using_local_dbt'] is False
 
 @then('I should see "Profile: TestProfile" in the banner')
-def check_test_profile_banner():
+def check_test_profile_banner(sqlbot_result):
     """Verify TestProfile is shown in banner."""
-    result = start_sqlbot_with_profile()
-    assert "Profile:** `TestProfile`" in result['banner_text']
+    assert "Profile:** `TestProfile`" in sqlbot_result['banner_text']
 
 @then('SQLBot should use the local dbt configuration')
-def check_local_dbt_usage():
+def check_local_dbt_usage(sqlbot_result):
     """Verify SQLBot uses local dbt configuration."""
-    profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
+    profiles_dir, is_local = sqlbot_result['profiles_dir'], sqlbot_result['is_local']
     assert is_local is True
     assert '.dbt' in profiles_dir
     assert profiles_dir.endswith('.dbt')
 
 @then('SQLBot should use the global dbt configuration')
-def check_global_dbt_usage():
+def check_global_dbt_usage(sqlbot_result):
     """Verify SQLBot uses global dbt configuration."""
-    profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
+    profiles_dir, is_local = sqlbot_result['profiles_dir'], sqlbot_result['is_local']
     assert is_local is False
     assert '/.dbt' in profiles_dir  # Should be /home/user/.dbt or similar
 
 @then('SQLBot should not use the global dbt configuration')
-def check_not_global_dbt_usage():
+def check_not_global_dbt_usage(sqlbot_result):
     """Verify SQLBot does not use global configuration when local exists."""
-    profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
-    assert is_local is True
+    assert sqlbot_result['is_local'] is True
     # Should be using local, not global
 
 @then('SQLBot should use the TestProfile from local configuration')
-def check_test_profile_usage():
+def check_test_profile_usage(sqlbot_result):
     """Verify SQLBot uses TestProfile from local configuration."""
-    profiles_dir, is_local = SQLBotConfig.detect_dbt_profiles_dir()
-    assert is_local is True
+    assert sqlbot_result['is_local'] is True
 
-    config = SQLBotConfig.from_env(profile='TestProfile')
-    dbt_service = get_dbt_service(config)
-    dbt_config_info = dbt_service.get_dbt_config_info()
+    dbt_config_info = sqlbot_result['dbt_config_info']
 
     assert dbt_config_info['is_using_local_dbt'] is True
     assert dbt_config_info['profile_name'] == 'TestProfile'
 
 @then('the query should succeed')
-def check_query_success():
+def check_query_success(query_result):
     """Verify SQL query execution succeeds."""
-    result = execute_sql_query()
-    assert result['result'].success is True
+    assert query_result['result'].success is True
 
 @then('I should see the result "1"')
-def check_query_result():
+def check_query_result(query_result):
     """Verify query returns expected result."""
-    result = execute_sql_query()
-    assert result['result'].data == [{'1': 1}]
+    assert query_result['result'].data == [{'1': 1}]
 
 @then('the banner should show local .dbt configuration')
-def check_banner_shows_local():
+def check_banner_shows_local(query_result):
     """Verify banner shows local configuration."""
-    result = execute_sql_query()
+    from sqlbot.interfaces.banner import get_banner_content
 
     banner_text = get_banner_content(
         profile='Sakila',
         llm_model='gpt-5',
         llm_available=True,
         interface_type='text',
-        dbt_config_info=result['dbt_config_info']
+        dbt_config_info=query_result['dbt_config_info']
     )
 
     assert "Local `.dbt/profiles.yml` (detected)" in banner_text
 
 @then('the DBT_PROFILES_DIR environment variable should point to the local .dbt folder')
-def check_dbt_profiles_dir_env():
+def check_dbt_profiles_dir_env(sakila_dbt_service):
     """Verify DBT_PROFILES_DIR environment variable is set correctly."""
-    config = SQLBotConfig.from_env(profile='Sakila')
-    dbt_service = get_dbt_service(config)
-
     # The environment should be set by DbtService._setup_environment()
     profiles_dir = os.environ.get('DBT_PROFILES_DIR')
     assert profiles_dir is not None
     assert '.dbt' in profiles_dir
 
 @then('dbt commands should work with the local configuration')
-def check_dbt_commands_work():
+def check_dbt_commands_work(sqlbot_result):
     """Verify dbt commands use local configuration."""
-    config = SQLBotConfig.from_env(profile='Sakila')
-    dbt_service = get_dbt_service(config)
-
-    # Verify the service was configured with local settings
-    dbt_config_info = dbt_service.get_dbt_config_info()
+    # Verify the service started by the When step was configured with local settings
+    dbt_config_info = sqlbot_result['dbt_config_info']
     assert dbt_config_info['is_using_local_dbt'] is True
     assert '.dbt' in dbt_config_info['profiles_dir']
\ No newline at end of file
@@ -1,88 +1,68 @@
 """Step definitions for preview feature BDD tests."""
 
 import pytest
-from pytest_bdd import scenarios, given, when, then, parsers
-from unittest.mock import Mock, patch, MagicMock
-import io
+from pytest_bdd import scenarios, when, then, parsers
+from unittest.mock import patch
 import sys
-from contextlib import contextmanager
+
+from sqlbot.core.types import CompilationResult
+from sqlbot.repl import handle_double_slash_command, preview_sql_compilation
 
 # Load all scenarios from the feature file
 scenarios('../../features/core/preview_feature.feature')
 
-@contextmanager
-def mock_input_output():
-    """Mock input/output for testing interactive features."""
-    mock_input = Mock()
-    mock_stdout = io.StringIO()
-    
-    with patch('builtins.input', mock_input), \
-         patch('sys.stdout', mock_stdout):
-        yield mock_input, mock_stdout
-
-@given('SQLBot is running in interactive mode')
-def qbot_interactive():
-    """Ensure SQLBot is running in interactive mode."""
-    # This is handled by conftest.py fixtures
-    pass
-
-@given('the database is available')
-def database_available():
-    """Ensure database is available."""
-    # This is handled by conftest.py fixtures
-    pass
+@pytest.fixture(scope="module", autouse=True)
+def mock_compile_preview():
+    """DbtService.compile_query_preview, patched once for the whole module.
 
-@given('I am in the SQLBot REPL')
-def in_qbot_repl():
-    """Ensure we're in the SQLBot REPL context."""
-    # Set up REPL context
-    pass
+    Tests set ``return_value`` to the CompilationResult they need.
+    """
+    with patch('sqlbot.core.dbt_service.DbtService.compile_query_preview') as mock_compile:
+        yield mock_compile
 
 @when('I enter "//preview"')
-def enter_preview_command():
+def enter_preview_command(input_queue, capsys):
     """User enters the //preview command."""
-    from sqlbot.repl import handle_double_slash_command
-    
-    with mock_input_output() as (mock_input, mock_stdout):
-        # Mock empty input to cancel preview
-        mock_input.return_value = ""
-        result = handle_double_slash_command("//preview")
+    # The empty input queue cancels the preview
+    handle_double_slash_command("//preview")
+    # Discard the preview prompt output
+    capsys.readouterr()
 
 @when(parsers.parse('I enter "{sql_query}"'))
-def enter_sql_query(sql_query):
+def enter_sql_query(sql_query, ctx):
     """User enters a SQL query."""
     # Store the query for later use in tests
-    pytest.current_query = sql_query
+    ctx.current_query = sql_query
 
 @when('I enter an empty query')
-def enter_empty_query():
+def enter_empty_query(ctx):
     """User enters an empty query."""
-    pytest.current_query = ""
+    ctx.current_query = ""
 
 @when('I press Ctrl+C during SQL input')
-def ctrl_c_during_input():
+def ctrl_c_during_input(ctx):
     """User presses Ctrl+C during SQL input."""
-    pytest.keyboard_interrupt = True
+    ctx.keyboard_interrupt = True
 
 @when('I press Ctrl+C during execution prompt')
-def ctrl_c_during_prompt():
+def ctrl_c_during_prompt(ctx):
     """User presses Ctrl+C during execution prompt."""
-    pytest.keyboard_interrupt_prompt = True
+    ctx.keyboard_interrupt_prompt = True
 
 @when(parsers.parse('I respond "{response}" to the execution prompt'))
-def respond_to_execution_prompt(response):
+def respond_to_execution_prompt(response, ctx):
     """User responds to execution prompt."""
-    pytest.execution_response = response
+    ctx.execution_response = response
 
 @when('I enter invalid SQL syntax')
-def enter_invalid_sql():
+def enter_invalid_sql(ctx):
     """User enters invalid SQL syntax."""
-    pytest.current_query = "INVALID SQL SYNTAX THAT WILL FAIL"
+    ctx.current_query = "INVALID SQL SYNTAX THAT WILL FAIL"
 
 @when(parsers.parse('I enter "{command}"'))
-def enter_command(command):
+def enter_command(command, ctx):
     """User enters a command."""
-    pytest.current_command = command
+    ctx.current_command = command
 
 @then('I should see "Preview Mode - Enter SQL to preview compilation:"')
 def should_see_preview_prompt():
@@ -165,9 +145,14 @@ def should_not_be_prompted():
     """Verify execution prompt is not shown."""
     pass
 
-@then(parsers.parse('I should see "{message}"'))
-def should_see_message(message):
-    """Verify specific message is displayed."""
+@then('I should see "Unknown double-slash command: //unknown"')
+def should_see_unknown_command():
+    """Verify unknown double-slash command message is shown."""
+    pass
+
+@then('I should see "//preview - Preview compiled SQL before execution"')
+def should_see_preview_command_help():
+    """Verify //preview is listed with its description."""
     pass
 
 @then('I should see available double-slash commands')
@@ -176,53 +161,36 @@ def should_see_available_commands():
     pass
 
 # Integration test that actually tests the preview functionality
-def test_preview_functionality_integration():
-    """Integration test for preview functionality."""
-    from sqlbot.repl import preview_sql_compilation, execute_clean_sql
-    from sqlbot.core.types import CompilationResult
-    import os
-    
-    # Set up environment
-    os.environ['DBT_PROFILE_NAME'] = 'Sakila'
-    
-    # Test SQL compilation preview
-    test_sql = "SELECT TOP 3 * FROM sakila.film"
-    
-    # Mock the dbt service compilation
-    mock_compilation_result = CompilationResult(
-        success=True,
-        compiled_sql='SELECT TOP 3 * FROM "sakila"."film"'
-    )
-    
-    with patch('sqlbot.core.dbt_service.DbtService.compile_query_preview') as mock_compile:
-        mock_compile.return_value = mock_compilation_result
-        
-        result = preview_sql_compilation(test_sql)
-        
-        assert 'SELECT TOP 3 * FROM "sakila"."film"' in result
-        assert mock_compile.called
-
-def test_preview_with_source_syntax():
-    """Test preview with dbt source syntax."""
-    from sqlbot.repl import preview_sql_compilation
-    from sqlbot.core.types import CompilationResult
-    import os
-    
-    os.environ['DBT_PROFILE_NAME'] = 'Sakila'
-    
-    test_sql = "SELECT TOP 5 * FROM {{ source('sakila', 'film') }}"
-    
+@pytest.mark.parametrize("test_sql, compiled_sql, expected, unexpected", [
+    (
+        "SELECT TOP 3 * FROM sakila.film",
+        'SELECT TOP 3 * FROM "sakila"."film"',
+        ['SELECT TOP 3 * FROM "sakila"."film"'],
+        [],
+    ),
+    (
+        "SELECT TOP 5 * FROM {{ source('sakila', 'film') }}",
+        'SELECT TOP 5 * FROM "sakila"."film"',
+        ["sakila", "film"],
+        ["{{ source"],
+    ),
+], ids=["plain_sql", "source_syntax"])
+def test_preview_sql_compilation(test_sql, compiled_sql, expected, unexpected,
+                                 mock_compile_preview, monkeypatch):
+    """Preview shows the SQL compiled by dbt, including dbt source syntax."""
+    monkeypatch.setenv('DBT_PROFILE_NAME', 'Sakila')
+
     # Mock the dbt service compilation
-    mock_compilation_result = CompilationResult(
+    mock_compile_preview.reset_mock()
+    mock_compile_preview.return_value = CompilationResult(
         success=True,
-        compiled_sql='SELECT TOP 5 * FROM "sakila"."film"'
+        compiled_sql=compiled_sql
     )
-    
-    with patch('sqlbot.core.dbt_service.DbtService.compile_query_preview') as mock_compile:
-        mock_compile.return_value = mock_compilation_result
-        
-        result = preview_sql_compilation(test_sql)
-        
-        assert "sakila" in result
-        assert "film" in result
-        assert "{{ source" not in result
\ No newline at end of file
+
+    result = preview_sql_compilation(test_sql)
+
+    for text in expected:
+        assert text in result
+    for text in unexpected:
+        assert text not in result
+    assert mock_compile_preview.called
@@ -4,6 +4,8 @@ Step definitions for query result management BDD tests
 
 import json
 import tempfile
+import time
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
 from pytest_bdd import scenarios, given, when, then, parsers
@@ -16,11 +18,20 @@ from sqlbot.core.types import QueryResult, QueryType
 # Load scenarios from feature file
 scenarios('../../features/core/query_result_management.feature')
 
+# Shape shared by the numbered query results; steps only swap in the data
+_QUERY_NUM_RESULT = QueryResult(
+    success=True,
+    query_type=QueryType.SQL,
+    execution_time=0.1,
+    columns=["query_num"],
+    row_count=1
+)
+
 
 @pytest.fixture
 def test_session_id():
     """Provide a unique test session ID"""
-    return f"test_session_{datetime.now().timestamp()}"
+    return f"test_session_{time.perf_counter_ns()}"
 
 
 @pytest.fixture
@@ -31,12 +42,22 @@ def temp_storage_dir():
 
 
 @pytest.fixture
-def query_result_list(test_session_id, temp_storage_dir):
-    """Provide a clean QueryResultList for testing"""
+def query_result_list(test_session_id, temp_storage_dir, request, monkeypatch):
+    """Provide a clean QueryResultList for testing
+
+    Results stay in memory unless the scenario is tagged @persistence, so
+    only the scenarios about reloading pay for writing JSON to disk.
+    """
     from sqlbot.core.query_result_list import _query_result_lists
+
+    if request.node.get_closest_marker('persistence') is None:
+        monkeypatch.setattr(QueryResultList, '_save_to_storage', lambda self: None)
     
     storage_path = temp_storage_dir / f"{test_session_id}.json"
     result_list = QueryResultList(test_session_id, storage_path)
+    # Bookkeeping the steps append to
+    result_list._entries_added = []
+    result_list._last_entry = None
     
     # Register the instance in the global registry so lookup tool can find it
     _query_result_lists[test_session_id] = result_list
@@ -52,7 +73,7 @@ def query_result_list(test_session_id, temp_storage_dir):
 
 @pytest.fixture
 def lookup_tool(test_session_id):
-    """Provide a query result lookup tool for testing"""
+    """Provide a query result lookup tool bound to the scenario's session"""
     return create_query_result_lookup_tool(test_session_id)
 
 
@@ -87,10 +108,8 @@ def execute_test_query(query_result_list):
     query_result_list._last_entry = entry
 
 
-@when(parsers.parse('I execute a SQL query "{query}"'))
-def execute_sql_query(query_result_list, query):
-    """Execute a SQL query with given text"""
-    # Mock successful result
+def _record_ok(query_result_list, query):
+    """Record a successful mock result for query and track its entry"""
     result = QueryResult(
         success=True,
         query_type=QueryType.SQL,
@@ -100,27 +119,20 @@ def execute_sql_query(query_result_list, query):
         row_count=1
     )
     entry = query_result_list.add_result(query, result)
-    if not hasattr(query_result_list, '_entries_added'):
-        query_result_list._entries_added = []
     query_result_list._entries_added.append(entry)
+    return entry
+
+
+@when(parsers.parse('I execute a SQL query "{query}"'))
+def execute_sql_query(query_result_list, query):
+    """Execute a SQL query with given text"""
+    _record_ok(query_result_list, query)
 
 
 @given(parsers.parse('I execute a SQL query "{query}"'))
 def given_execute_sql_query(query_result_list, query):
     """Execute a SQL query with given text (Given step)"""
-    # Mock successful result
-    result = QueryResult(
-        success=True,
-        query_type=QueryType.SQL,
-        execution_time=0.1,
-        data=[{"result": "mock_data"}],
-        columns=["result"],
-        row_count=1
-    )
-    entry = query_result_list.add_result(query, result)
-    if not hasattr(query_result_list, '_entries_added'):
-        query_result_list._entries_added = []
-    query_result_list._entries_added.append(entry)
+    _record_ok(query_result_list, query)
 
 
 @when(parsers.parse('I execute an invalid SQL query "{query}"'))
@@ -139,8 +151,11 @@ def execute_invalid_query(query_result_list, query):
 @when(parsers.parse("I use the query_result_lookup tool with index {index:d}"))
 def use_lookup_tool(lookup_tool, index):
     """Use the lookup tool to retrieve a result by index"""
+    # No explicit session ID: the tool falls back to the one it was created with
     result = lookup_tool._run(index)
     lookup_tool._last_result = result
+    # Parsed once here so each Then step can read fields directly
+    lookup_tool._last_parsed = json.loads(result) if isinstance(result, str) else result
 
 
 @when("I create a new QueryResultList with the same session ID")
@@ -151,24 +166,22 @@ def create_new_result_list(test_session_id, temp_storage_dir, query_result_list)
     query_result_list._new_instance = new_list
 
 
-@given("I have a session \"session_A\"")
+@given("I have a session \"session_A\"", target_fixture="session_a")
 def create_session_a(temp_storage_dir):
     """Create session A"""
     storage_path = temp_storage_dir / "session_A.json"
-    session_a = QueryResultList("session_A", storage_path)
-    create_session_a.session_a = session_a
+    return QueryResultList("session_A", storage_path)
 
 
-@given("I have a session \"session_B\"")
+@given("I have a session \"session_B\"", target_fixture="session_b")
 def create_session_b(temp_storage_dir):
     """Create session B"""
     storage_path = temp_storage_dir / "session_B.json"
-    session_b = QueryResultList("session_B", storage_path)
-    create_session_b.session_b = session_b
+    return QueryResultList("session_B", storage_path)
 
 
 @when("I execute a query in session_A")
-def execute_in_session_a():
+def execute_in_session_a(session_a):
     """Execute a query in session A"""
     result = QueryResult(
         success=True,
@@ -178,11 +191,11 @@ def execute_in_session_a():
         columns=["data"],
         row_count=1
     )
-    create_session_a.session_a.add_result("SELECT 'session_a' as data", result)
+    session_a.add_result("SELECT 'session_a' as data", result)
 
 
 @when("I execute a query in session_B")
-def execute_in_session_b():
+def execute_in_session_b(session_b):
     """Execute a query in session B"""
     result = QueryResult(
         success=True,
@@ -192,37 +205,26 @@ def execute_in_session_b():
         columns=["data"],
         row_count=1
     )
-    create_session_b.session_b.add_result("SELECT 'session_b' as data", result)
+    session_b.add_result("SELECT 'session_b' as data", result)
+
+
+def _add_numbered_results(query_result_list, count):
+    """Record ``count`` successful 'SELECT <n> as query_num' results"""
+    for i in range(1, count + 1):
+        result = replace(_QUERY_NUM_RESULT, data=[{"query_num": str(i)}])
+        query_result_list.add_result(f"SELECT {i} as query_num", result)
 
 
 @given("I have executed 3 queries with results")
 def execute_three_queries(query_result_list):
     """Execute 3 queries with results"""
-    for i in range(1, 4):
-        result = QueryResult(
-            success=True,
-            query_type=QueryType.SQL,
-            execution_time=0.1,
-            data=[{"query_num": str(i)}],
-            columns=["query_num"],
-            row_count=1
-        )
-        query_result_list.add_result(f"SELECT {i} as query_num", result)
+    _add_numbered_results(query_result_list, 3)
 
 
 @given("I have executed 2 queries with results")
 def execute_two_queries(query_result_list):
     """Execute 2 queries with results"""
-    for i in range(1, 3):
-        result = QueryResult(
-            success=True,
-            query_type=QueryType.SQL,
-            execution_time=0.1,
-            data=[{"query_num": str(i)}],
-            columns=["query_num"],
-            row_count=1
-        )
-        query_result_list.add_result(f"SELECT {i} as query_num", result)
+    _add_numbered_results(query_result_list, 2)
 
 
 # Then steps
@@ -270,13 +272,10 @@ def check_sequential_indices(query_result_list):
 @then("each result should have a unique timestamp")
 def check_unique_timestamps(query_result_list):
     """Check that each result has a unique timestamp"""
-    timestamps = []
-    for i in range(1, 4):
-        entry = query_result_list.get_result(i)
-        timestamps.append(entry.timestamp)
-    
+    timestamps = {query_result_list.get_result(i).timestamp for i in range(1, 4)}
+
     # All timestamps should be different
-    assert len(set(timestamps)) == len(timestamps)
+    assert len(timestamps) == 3
 
 
 @then("the latest result should be index 3")
@@ -289,8 +288,7 @@ def check_latest_result(query_result_list):
 @then("I should get the full data from query result #2")
 def check_lookup_result_2(lookup_tool):
     """Check that lookup returns full data for result #2"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert data["query_index"] == 2
     assert "data" in data
     assert "columns" in data
@@ -299,8 +297,7 @@ def check_lookup_result_2(lookup_tool):
 @then("the data should include the original query text")
 def check_lookup_query_text(lookup_tool):
     """Check that lookup result includes original query text"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert "query_text" in data
     assert "SELECT" in data["query_text"]
 
@@ -308,8 +305,7 @@ def check_lookup_query_text(lookup_tool):
 @then("the data should include all columns and rows")
 def check_lookup_columns_rows(lookup_tool):
     """Check that lookup result includes columns and rows"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert "columns" in data
     assert "data" in data
     assert isinstance(data["data"], list)
@@ -318,8 +314,7 @@ def check_lookup_columns_rows(lookup_tool):
 @then("the data should include execution metadata")
 def check_lookup_metadata(lookup_tool):
     """Check that lookup result includes execution metadata"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert "execution_time" in data
     assert "timestamp" in data
 
@@ -327,8 +322,7 @@ def check_lookup_metadata(lookup_tool):
 @then("I should get an error message about index not found")
 def check_lookup_error(lookup_tool):
     """Check that lookup returns error for invalid index"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert "error" in data
     assert "not found" in data["error"]
 
@@ -336,8 +330,7 @@ def check_lookup_error(lookup_tool):
 @then("the error should list available indices [1, 2]")
 def check_available_indices(lookup_tool):
     """Check that error lists available indices"""
-    result_json = lookup_tool._last_result
-    data = json.loads(result_json)
+    data = lookup_tool._last_parsed
     assert "available_indices" in data
     assert data["available_indices"] == [1, 2]
 
@@ -396,29 +389,24 @@ def check_persistent_data(query_result_list):
 
 
 @then("session_A should have 1 result with index 1")
-def check_session_a_result():
+def check_session_a_result(session_a):
     """Check session A has correct result"""
-    session_a = create_session_a.session_a
     assert len(session_a) == 1
     entry = session_a.get_result(1)
     assert entry.index == 1
 
 
 @then("session_B should have 1 result with index 1")
-def check_session_b_result():
+def check_session_b_result(session_b):
     """Check session B has correct result"""
-    session_b = create_session_b.session_b
     assert len(session_b) == 1
     entry = session_b.get_result(1)
     assert entry.index == 1
 
 
 @then("the results should be independent")
-def check_session_independence():
+def check_session_independence(session_a, session_b):
     """Check that sessions have independent results"""
-    session_a = create_session_a.session_a
-    session_b = create_session_b.session_b
-    
     entry_a = session_a.get_result(1)
     entry_b = session_b.get_result(1)
     
@@ -3,49 +3,11 @@ BDD step definitions for REPL error display.
 Tests that database errors are clearly displayed to users in the REPL interface.
 """
 
-import pytest
 from pytest_bdd import scenarios, given, when, then, parsers
-from unittest.mock import Mock, patch, MagicMock
-import sys
-import os
-
-# Add the project root to Python path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 
 # Load scenarios from feature file
 scenarios('../../features/core/repl_error_display.feature')
 
-@pytest.fixture
-def mock_repl_console():
-    """Mock Rich console for REPL testing"""
-    console = Mock()
-    console.print = Mock()
-    return console
-
-@pytest.fixture
-def mock_subprocess_result():
-    """Mock subprocess result for testing database errors"""
-    result = Mock()
-    result.returncode = 1
-    result.stdout = "Database Error: Table 'nonexistent_table' doesn't exist"
-    result.stderr = "Error: Connection failed"
-    return result
-
-@given("SQLBot REPL is running")
-def qbot_repl_running():
-    """Set up SQLBot REPL environment"""
-    pass
-
-@given("the database connection is configured")
-def database_connection_configured():
-    """Ensure database connection is set up"""
-    pass
-
-@given("I am in the SQLBot REPL")
-def in_qbot_repl(mock_repl_console):
-    """Simulate being in the SQLBot REPL"""
-    pass
-
 @given("SQLBot is configured with invalid database credentials")
 def invalid_database_credentials():
     """Configure SQLBot with invalid credentials"""
@@ -67,11 +29,10 @@ def run_qbot_noninteractive():
     pass
 
 @when(parsers.parse('I enter an invalid SQL query "{query}"'))
-def enter_invalid_sql(query, mock_subprocess_result):
+def enter_invalid_sql(query, mock_subprocess_result, ctx):
     """Simulate entering invalid SQL"""
-    # Mock the execute_clean_sql function to return an error
-    with patch('sqlbot.repl.execute_clean_sql') as mock_execute:
-        mock_execute.return_value = f"Error executing query:\nSTDOUT: {mock_subprocess_result.stdout}\nSTDERR: {mock_subprocess_result.stderr}"
+    # The error text execute_clean_sql reports for a failed dbt run
+    ctx.query_error = f"Error executing query:\nSTDOUT: {mock_subprocess_result.stdout}\nSTDERR: {mock_subprocess_result.stderr}"
 
 @when(parsers.parse('I ask "{question}"'))
 def ask_question_repl(question):
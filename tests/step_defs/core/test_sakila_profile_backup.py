@@ -2,10 +2,10 @@
 
 import os
 import re
+import shutil
 import stat
-import tempfile
-import time
 import yaml
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch
 
@@ -13,38 +13,89 @@ import pytest
 from pytest_bdd import given, when, then, scenarios
 
 from sqlbot.core.sakila import SakilaManager
+from tests.step_defs.core._fixtures import (
+    DBT_DIR,
+    EXISTING_PROFILES,
+    EXISTING_PROFILES_YAML,
+    PROFILES_YML,
+    SIMPLE_PROFILES,
+    SIMPLE_PROFILES_YAML,
+    SafeLoader,
+    write_profiles,
+)
 
 # Load scenarios from feature file
 scenarios('../../features/sakila_profile_backup.feature')
 
+# Backup names written by SakilaManager.create_profiles_backup (YYYYMMDD_HHMMSS)
+_TIMESTAMP_RE = re.compile(r'^profiles\.backup\.(\d{8}_\d{6})\.yml$')
 
-@pytest.fixture
+_SAKILA_DB = Path('profiles/Sakila/data/sakila.db')
+
+
+def _load_profiles(test_context):
+    """Parse .dbt/profiles.yml once per scenario and reuse it across @then steps.
+
+    The cache is keyed on the file's mtime and size, so a rewrite by the
+    setup under test is picked up even if a step forgets to invalidate it.
+    """
+    st = PROFILES_YML.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    cached = test_context.get('_profiles_cache')
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(PROFILES_YML, 'r') as f:
+        profiles = yaml.load(f, Loader=SafeLoader)
+    test_context['_profiles_cache'] = (key, profiles)
+    return profiles
+
+
+def _backup_files(test_context):
+    """List the profiles.yml backups once per scenario, sorted by name (oldest first)."""
+    backup_files = test_context.get('backup_files')
+    if backup_files is None:
+        try:
+            with os.scandir(DBT_DIR) as entries:
+                backup_files = sorted(
+                    DBT_DIR / entry.name for entry in entries
+                    if entry.name.startswith('profiles.backup.') and entry.name.endswith('.yml')
+                )
+        except FileNotFoundError:
+            backup_files = []
+        test_context['backup_files'] = backup_files
+    return backup_files
+
+
+@pytest.fixture(scope='module')
 def sakila_manager():
-    """Create a SakilaManager instance for testing."""
+    """Create a SakilaManager instance shared by the module's scenarios."""
     return SakilaManager(create_local_profile=True)
 
 
 @pytest.fixture
-def test_context():
-    """Provide test context with temporary directory management."""
-    context = {}
-    with tempfile.TemporaryDirectory() as temp_dir:
-        old_cwd = os.getcwd()
-        try:
-            os.chdir(temp_dir)
-            context['temp_dir'] = temp_dir
-            context['old_cwd'] = old_cwd
-            yield context
-        finally:
-            os.chdir(old_cwd)
+def test_context(tmp_path, monkeypatch):
+    """Provide test context with a fresh tmp_path as the working directory."""
+    # pytest restores the working directory and prunes old tmp_path trees
+    monkeypatch.chdir(tmp_path)
+    # Resolved: on macOS the temp dir sits behind a /private symlink
+    return {'temp_dir': str(tmp_path.resolve())}
+
+
+@pytest.fixture
+def sakila_db_file(test_context):
+    """Placeholder Sakila database the profile setup points at."""
+    db_file = _SAKILA_DB
+    if not db_file.exists():
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+        db_file.touch()
+    return db_file
 
 
 @given('I have a clean test environment')
 def clean_test_environment(test_context):
     """Ensure we start with a clean test environment."""
-    # Context is already set up in the fixture
-    # On macOS, temp paths may have /private prefix, so resolve both paths
-    assert Path.cwd().resolve() == Path(test_context['temp_dir']).resolve()
+    # Context is already set up in the fixture; temp_dir is pre-resolved
+    assert os.getcwd() == test_context['temp_dir']
 
 
 @given('I have SQLite installed and available')
@@ -68,37 +119,9 @@ def create_existing_profiles(test_context):
     dbt_dir = test_context['dbt_dir']
     profiles_file = dbt_dir / 'profiles.yml'
     
-    existing_profiles = {
-        'my_postgres_db': {
-            'target': 'dev',
-            'outputs': {
-                'dev': {
-                    'type': 'postgres',
-                    'host': 'localhost',
-                    'user': 'postgres',
-                    'password': 'secret',
-                    'port': 5432,
-                    'dbname': 'mydb'
-                }
-            }
-        },
-        'my_snowflake_db': {
-            'target': 'prod',
-            'outputs': {
-                'prod': {
-                    'type': 'snowflake',
-                    'account': 'myaccount',
-                    'user': 'myuser',
-                    'warehouse': 'mywarehouse'
-                }
-            }
-        }
-    }
+    write_profiles(profiles_file, EXISTING_PROFILES_YAML)
     
-    with open(profiles_file, 'w') as f:
-        yaml.dump(existing_profiles, f, default_flow_style=False)
-    
-    test_context['original_profiles'] = existing_profiles
+    test_context['original_profiles'] = EXISTING_PROFILES
     test_context['profiles_file'] = profiles_file
 
 
@@ -116,11 +139,10 @@ def create_profiles_with_permissions(test_context):
 @given('I have no existing .dbt directory')
 def no_dbt_directory(test_context):
     """Ensure no .dbt directory exists."""
-    dbt_dir = Path('.dbt')
-    if dbt_dir.exists():
-        import shutil
-        shutil.rmtree(dbt_dir)
-    assert not dbt_dir.exists()
+    try:
+        shutil.rmtree('.dbt')
+    except FileNotFoundError:
+        pass
 
 
 @given('I have an existing profiles.yml file')
@@ -130,82 +152,59 @@ def create_simple_profiles_file(test_context):
     dbt_dir = test_context['dbt_dir']
     profiles_file = dbt_dir / 'profiles.yml'
     
-    simple_profiles = {
-        'test_profile': {
-            'target': 'dev',
-            'outputs': {
-                'dev': {
-                    'type': 'duckdb',
-                    'path': 'test.db'
-                }
-            }
-        }
-    }
-    
-    with open(profiles_file, 'w') as f:
-        yaml.dump(simple_profiles, f)
+    write_profiles(profiles_file, SIMPLE_PROFILES_YAML)
     
     test_context['profiles_file'] = profiles_file
-    test_context['original_profiles'] = simple_profiles
+    test_context['original_profiles'] = SIMPLE_PROFILES
 
 
 @given('the backup operation will fail due to permissions')
-def mock_backup_failure(test_context, sakila_manager):
+def mock_backup_failure(test_context, sakila_manager, monkeypatch):
     """Mock backup operation to fail.""" 
-    original_backup = sakila_manager.create_profiles_backup
-    
     def failing_backup(profiles_file):
         # Instead of raising an exception that breaks the flow,
         # just return None to simulate failure
         print("⚠ Warning: Could not create backup of profiles.yml: Simulated permission error for backup")
         return None
     
-    sakila_manager.create_profiles_backup = failing_backup
+    # monkeypatch restores the shared manager's method after the scenario
+    monkeypatch.setattr(sakila_manager, 'create_profiles_backup', failing_backup)
     test_context['backup_will_fail'] = True
 
 
 @when('I run the Sakila profile setup')
-def run_sakila_profile_setup(test_context, sakila_manager):
+def run_sakila_profile_setup(test_context, sakila_manager, sakila_db_file):
     """Run the Sakila profile setup process."""
-    # Create database file for the setup
-    db_dir = Path('profiles/Sakila/data')
-    db_dir.mkdir(parents=True, exist_ok=True)
-    db_file = db_dir / 'sakila.db'
-    db_file.touch()
-    
     # Mock SQLite availability check
     with patch.object(sakila_manager, 'check_sqlite_availability', return_value=True):
-        result = sakila_manager.create_local_dbt_profile('profiles/Sakila/data/sakila.db')
+        result = sakila_manager.create_local_dbt_profile(str(sakila_db_file))
     
     test_context['setup_result'] = result
+    test_context.pop('backup_files', None)
+    test_context.pop('_profiles_cache', None)
 
 
 @when('I run the Sakila profile setup multiple times')
-def run_sakila_setup_multiple_times(test_context, sakila_manager):
-    """Run Sakila profile setup multiple times with small delays."""
-    # Create database file
-    db_dir = Path('profiles/Sakila/data')
-    db_dir.mkdir(parents=True, exist_ok=True)
-    db_file = db_dir / 'sakila.db'
-    db_file.touch()
-    
+def run_sakila_setup_multiple_times(test_context, sakila_manager, sakila_db_file):
+    """Run Sakila profile setup multiple times, one simulated second apart."""
     results = []
     for i in range(3):
-        if i > 0:
-            time.sleep(1)  # Ensure different timestamps
-        
-        with patch.object(sakila_manager, 'check_sqlite_availability', return_value=True):
-            result = sakila_manager.create_local_dbt_profile('profiles/Sakila/data/sakila.db')
+        # Step the backup clock instead of sleeping so each timestamp differs
+        with patch.object(sakila_manager, 'check_sqlite_availability', return_value=True), \
+             patch('sqlbot.core.sakila.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 1, 1, 0, 0, i)
+            result = sakila_manager.create_local_dbt_profile(str(sakila_db_file))
         results.append(result)
     
     test_context['setup_results'] = results
+    test_context.pop('backup_files', None)
+    test_context.pop('_profiles_cache', None)
 
 
 @then('a timestamped backup of profiles.yml should be created')
 def verify_timestamped_backup_created(test_context):
     """Verify that a timestamped backup was created."""
-    dbt_dir = Path('.dbt')
-    backup_files = list(dbt_dir.glob('profiles.backup.*.yml'))
+    backup_files = _backup_files(test_context)
     
     assert len(backup_files) >= 1, "At least one backup file should be created"
     
@@ -214,21 +213,18 @@ def verify_timestamped_backup_created(test_context):
     assert backup_file.suffix == '.yml', "Backup should preserve .yml extension"
     
     # Verify timestamp format (YYYYMMDD_HHMMSS)
-    timestamp_pattern = r'profiles\.backup\.(\d{8}_\d{6})\.yml'
-    match = re.match(timestamp_pattern, backup_file.name)
+    match = _TIMESTAMP_RE.match(backup_file.name)
     assert match is not None, f"Backup filename should match timestamp pattern: {backup_file.name}"
-    
-    test_context['backup_files'] = backup_files
 
 
 @then('the backup should contain my original profile data')
 def verify_backup_content(test_context):
     """Verify backup contains original profile data."""
-    backup_files = test_context['backup_files']
+    backup_files = _backup_files(test_context)
     original_profiles = test_context['original_profiles']
     
     with open(backup_files[0], 'r') as f:
-        backup_content = yaml.safe_load(f)
+        backup_content = yaml.load(f, Loader=SafeLoader)
     
     assert backup_content == original_profiles, "Backup should contain original profile data"
 
@@ -236,11 +232,8 @@ def verify_backup_content(test_context):
 @then('the new profiles.yml should contain both old and new profiles')
 def verify_merged_profiles(test_context):
     """Verify new profiles.yml contains both old and new profiles."""
-    profiles_file = Path('.dbt/profiles.yml')
     original_profiles = test_context['original_profiles']
-    
-    with open(profiles_file, 'r') as f:
-        new_profiles = yaml.safe_load(f)
+    new_profiles = _load_profiles(test_context)
     
     # Should contain original profiles
     for profile_name, profile_config in original_profiles.items():
@@ -255,17 +248,20 @@ def verify_merged_profiles(test_context):
 @then('a backup should be created with the same content')
 def verify_backup_same_content(test_context):
     """Verify backup has same content as original."""
-    # First find the backup files
-    verify_timestamped_backup_created(test_context)
-    # Then verify content
-    verify_backup_content(test_context)
+    backup_files = _backup_files(test_context)
+    assert backup_files, "At least one backup file should be created"
+
+    with open(backup_files[0], 'r') as f:
+        backup_content = yaml.load(f, Loader=SafeLoader)
+
+    assert backup_content == test_context['original_profiles'], "Backup should contain original profile data"
 
 
 @then('the backup should preserve the original file metadata')
 def verify_backup_metadata(test_context):
     """Verify backup preserves original file metadata."""
     # Note: shutil.copy2 preserves timestamps and permissions
-    backup_files = test_context['backup_files']
+    backup_files = _backup_files(test_context)
     
     assert len(backup_files) >= 1, "Backup file should exist"
     # Detailed metadata verification would require more complex setup
@@ -275,20 +271,15 @@ def verify_backup_metadata(test_context):
 @then('no backup file should be created')
 def verify_no_backup_created(test_context):
     """Verify no backup files were created."""
-    dbt_dir = Path('.dbt')
-    if dbt_dir.exists():
-        backup_files = list(dbt_dir.glob('profiles.backup.*.yml'))
-        assert len(backup_files) == 0, "No backup files should be created for new profiles"
+    assert len(_backup_files(test_context)) == 0, "No backup files should be created for new profiles"
 
 
 @then('a new profiles.yml should be created with Sakila profile')
 def verify_new_profiles_created(test_context):
     """Verify new profiles.yml was created with Sakila profile."""
-    profiles_file = Path('.dbt/profiles.yml')
-    assert profiles_file.exists(), "New profiles.yml should be created"
+    assert PROFILES_YML.exists(), "New profiles.yml should be created"
     
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles(test_context)
     
     assert 'Sakila' in profiles, "New profiles should contain Sakila profile"
     assert profiles['Sakila']['target'] == 'dev', "Sakila profile should be properly configured"
@@ -311,10 +302,7 @@ def verify_setup_completed_successfully(test_context):
 @then('the Sakila profile should be added to profiles.yml')
 def verify_sakila_profile_added(test_context):
     """Verify Sakila profile was added despite backup failure."""
-    profiles_file = Path('.dbt/profiles.yml')
-    
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles(test_context)
     
     assert 'Sakila' in profiles, "Sakila profile should be added despite backup failure"
 
@@ -322,24 +310,20 @@ def verify_sakila_profile_added(test_context):
 @then('multiple backup files should be created')
 def verify_multiple_backups_created(test_context):
     """Verify multiple backup files were created."""
-    dbt_dir = Path('.dbt')
-    backup_files = list(dbt_dir.glob('profiles.backup.*.yml'))
+    backup_files = _backup_files(test_context)
     
     expected_count = len(test_context['setup_results'])
     assert len(backup_files) == expected_count, f"Should create {expected_count} backup files"
-    
-    test_context['backup_files'] = backup_files
 
 
 @then('each backup file should have a unique timestamp')
 def verify_unique_timestamps(test_context):
     """Verify each backup file has a unique timestamp."""
-    backup_files = test_context['backup_files']
+    backup_files = _backup_files(test_context)
     
     timestamps = []
     for backup_file in backup_files:
-        timestamp_pattern = r'profiles\.backup\.(\d{8}_\d{6})\.yml'
-        match = re.match(timestamp_pattern, backup_file.name)
+        match = _TIMESTAMP_RE.match(backup_file.name)
         assert match is not None, f"Backup filename should match pattern: {backup_file.name}"
         timestamps.append(match.group(1))
     
@@ -356,24 +340,17 @@ def verify_no_backup_overwritten(test_context):
 @then('the backup filename should follow the pattern "profiles.backup.YYYYMMDD_HHMMSS.yml"')
 def verify_backup_filename_pattern(test_context):
     """Verify backup filename follows the expected pattern."""
-    dbt_dir = Path('.dbt')
-    backup_files = list(dbt_dir.glob('profiles.backup.*.yml'))
+    backup_files = _backup_files(test_context)
     
     assert len(backup_files) >= 1, "At least one backup file should exist"
     
     backup_file = backup_files[0]
-    pattern = r'^profiles\.backup\.\d{8}_\d{6}\.yml$'
-    assert re.match(pattern, backup_file.name), f"Backup filename should match pattern: {backup_file.name}"
+    assert _TIMESTAMP_RE.match(backup_file.name), f"Backup filename should match pattern: {backup_file.name}"
 
 
 @then('the backup should be in the same directory as the original file')
 def verify_backup_same_directory(test_context):
     """Verify backup is in the same directory as original."""
-    dbt_dir = Path('.dbt')
-    profiles_file = dbt_dir / 'profiles.yml'
-    backup_files = list(dbt_dir.glob('profiles.backup.*.yml'))
-    
-    assert len(backup_files) >= 1, "Backup file should exist"
-    
-    backup_file = backup_files[0]
-    assert backup_file.parent == profiles_file.parent, "Backup should be in same directory as original"
\ No newline at end of file
+    backup_files = _backup_files(test_context)
+    assert backup_files, "Backup file should exist"
+    assert backup_files[0].parent == DBT_DIR, "Backup should be in same directory as original"
\ No newline at end of file
@@ -8,12 +8,27 @@ import yaml
 from pathlib import Path
 from pytest_bdd import scenarios, given, when, then, parsers
 from unittest.mock import patch, Mock
-import subprocess
+
+from tests.step_defs.core._fixtures import (
+    DBT_DIR,
+    PROFILES_YML,
+    SAMPLE_EXISTING_PROFILES,
+    SAMPLE_EXISTING_PROFILES_YAML,
+    STALE_SAKILA_PROFILE_YAML,
+    SafeLoader,
+    write_profiles,
+)
 
 # Skip BDD scenarios due to pytest teardown issues with temporary directories
 # The functionality is thoroughly tested in tests/integration/test_local_dbt_folder_integration.py
 # scenarios('../../features/core/sakila_profile_management.feature')
 
+
+def _load_profiles():
+    """Parse the local .dbt/profiles.yml written by the setup under test."""
+    with open(PROFILES_YML, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
 @pytest.fixture(scope="function")
 def temp_project_dir():
     """Create a temporary project directory for testing."""
@@ -43,20 +58,7 @@ def setup_script_path():
 @pytest.fixture
 def sample_existing_profiles():
     """Sample existing profiles.yml content."""
-    return {
-        'existing_profile': {
-            'target': 'dev',
-            'outputs': {
-                'dev': {
-                    'type': 'postgres',
-                    'host': 'localhost',
-                    'user': 'testuser',
-                    'password': 'testpass',
-                    'dbname': 'testdb'
-                }
-            }
-        }
-    }
+    return SAMPLE_EXISTING_PROFILES
 
 @given('I have SQLBot installed')
 def sqlbot_installed():
@@ -75,19 +77,19 @@ def setup_script_available(setup_script_path):
 @given('I do not have a local .dbt folder')
 def no_local_dbt_folder(temp_project_dir):
     """Ensure no local .dbt folder exists."""
-    dbt_dir = Path('.dbt')
-    if dbt_dir.exists():
-        shutil.rmtree(dbt_dir)
+    try:
+        shutil.rmtree('.dbt')
+    except FileNotFoundError:
+        pass
 
 @given('I have a local .dbt folder with existing profiles')
-def create_local_dbt_with_existing_profiles(temp_project_dir, sample_existing_profiles):
+def create_local_dbt_with_existing_profiles(temp_project_dir):
     """Create local .dbt folder with existing profiles."""
     dbt_dir = Path('.dbt')
     dbt_dir.mkdir(exist_ok=True)
 
     profiles_file = dbt_dir / 'profiles.yml'
-    with open(profiles_file, 'w') as f:
-        yaml.dump(sample_existing_profiles, f, default_flow_style=False)
+    write_profiles(profiles_file, SAMPLE_EXISTING_PROFILES_YAML)
 
     return str(dbt_dir)
 
@@ -97,27 +99,8 @@ def create_local_dbt_with_sakila_profile(temp_project_dir):
     dbt_dir = Path('.dbt')
     dbt_dir.mkdir(exist_ok=True)
 
-    existing_sakila_profile = {
-        'Sakila': {
-            'target': 'dev',
-            'outputs': {
-                'dev': {
-                    'type': 'sqlite',
-                    'threads': 1,
-                    'database': 'database',
-                    'schema': 'main',
-                    'schemas_and_paths': {
-                        'main': '/old/path/to/sakila.db'
-                    },
-                    'schema_directory': '/old/path/'
-                }
-            }
-        }
-    }
-
     profiles_file = dbt_dir / 'profiles.yml'
-    with open(profiles_file, 'w') as f:
-        yaml.dump(existing_sakila_profile, f, default_flow_style=False)
+    write_profiles(profiles_file, STALE_SAKILA_PROFILE_YAML)
 
     return str(dbt_dir)
 
@@ -164,9 +147,7 @@ def create_local_dbt_with_valid_sakila(temp_project_dir):
         }
     }
 
-    profiles_file = dbt_dir / 'profiles.yml'
-    with open(profiles_file, 'w') as f:
-        yaml.dump(sakila_profile, f, default_flow_style=False)
+    write_profiles(dbt_dir / 'profiles.yml', sakila_profile)
 
     return str(dbt_dir), str(db_file)
 
@@ -190,23 +171,23 @@ def ensure_database_file_exists():
     db_file = db_dir / 'sakila.db'
     db_file.touch()
 
+def _mock_sakila_setup():
+    """Patch out SakilaSetup's download, install and SQLite checks in one call."""
+    return patch.multiple(
+        'scripts.setup_sakila_db.SakilaSetup',
+        download_sakila_sqlite=Mock(return_value=Path('/tmp/fake_sakila.db')),
+        install_sakila_sqlite=Mock(return_value=True),
+        verify_sqlite_installation=Mock(return_value=True),
+        check_sqlite_availability=Mock(return_value=True),
+    )
+
 @when('I run the Sakila setup script')
 def run_sakila_setup_script(setup_script_path):
     """Run the Sakila setup script with mocked database operations."""
     from scripts.setup_sakila_db import SakilaSetup
 
     # Mock the database download and installation
-    with patch.object(SakilaSetup, 'download_sakila_sqlite') as mock_download, \
-         patch.object(SakilaSetup, 'install_sakila_sqlite') as mock_install, \
-         patch.object(SakilaSetup, 'verify_sqlite_installation') as mock_verify, \
-         patch.object(SakilaSetup, 'check_sqlite_availability') as mock_check:
-
-        # Set up mocks
-        mock_check.return_value = True
-        mock_download.return_value = Path('/tmp/fake_sakila.db')
-        mock_install.return_value = True
-        mock_verify.return_value = True
-
+    with _mock_sakila_setup():
         # Create the expected database directory structure
         db_dir = Path('profiles/Sakila/data')
         db_dir.mkdir(parents=True, exist_ok=True)
@@ -225,17 +206,7 @@ def run_sakila_setup_script_no_profile(setup_script_path):
     from scripts.setup_sakila_db import SakilaSetup
 
     # Mock the database operations
-    with patch.object(SakilaSetup, 'download_sakila_sqlite') as mock_download, \
-         patch.object(SakilaSetup, 'install_sakila_sqlite') as mock_install, \
-         patch.object(SakilaSetup, 'verify_sqlite_installation') as mock_verify, \
-         patch.object(SakilaSetup, 'check_sqlite_availability') as mock_check:
-
-        # Set up mocks
-        mock_check.return_value = True
-        mock_download.return_value = Path('/tmp/fake_sakila.db')
-        mock_install.return_value = True
-        mock_verify.return_value = True
-
+    with _mock_sakila_setup():
         # Create the expected database directory structure
         db_dir = Path('profiles/Sakila/data')
         db_dir.mkdir(parents=True, exist_ok=True)
@@ -261,26 +232,21 @@ def check_local_dbt_profile():
 @then('a local .dbt folder should be created')
 def check_local_dbt_folder_created():
     """Verify local .dbt folder was created."""
-    dbt_dir = Path('.dbt')
-    assert dbt_dir.exists(), "Local .dbt folder was not created"
+    assert DBT_DIR.exists(), "Local .dbt folder was not created"
 
 @then('the local profiles.yml should contain the Sakila profile')
 def check_sakila_profile_exists():
     """Verify Sakila profile exists in local profiles.yml."""
-    profiles_file = Path('.dbt/profiles.yml')
-    assert profiles_file.exists(), "Local profiles.yml was not created"
+    assert PROFILES_YML.exists(), "Local profiles.yml was not created"
 
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     assert 'Sakila' in profiles, "Sakila profile not found in local profiles.yml"
 
 @then('the Sakila profile should point to the correct database file')
 def check_sakila_profile_database_path():
     """Verify Sakila profile points to correct database file."""
-    profiles_file = Path('.dbt/profiles.yml')
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     sakila_config = profiles['Sakila']['outputs']['dev']
     db_path = sakila_config['schemas_and_paths']['main']
@@ -291,9 +257,7 @@ def check_sakila_profile_database_path():
 @then('the existing profiles should be preserved')
 def check_existing_profiles_preserved(sample_existing_profiles):
     """Verify existing profiles were preserved."""
-    profiles_file = Path('.dbt/profiles.yml')
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     for profile_name in sample_existing_profiles:
         assert profile_name in profiles, f"Existing profile {profile_name} was not preserved"
@@ -306,9 +270,7 @@ def check_sakila_profile_added():
 @then('the local profiles.yml should contain both old and new profiles')
 def check_all_profiles_present(sample_existing_profiles):
     """Verify both existing and new profiles are present."""
-    profiles_file = Path('.dbt/profiles.yml')
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     # Check existing profiles
     for profile_name in sample_existing_profiles:
@@ -320,9 +282,7 @@ def check_all_profiles_present(sample_existing_profiles):
 @then('the existing Sakila profile should be updated')
 def check_sakila_profile_updated():
     """Verify existing Sakila profile was updated."""
-    profiles_file = Path('.dbt/profiles.yml')
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     sakila_config = profiles['Sakila']['outputs']['dev']
     db_path = sakila_config['schemas_and_paths']['main']
@@ -344,8 +304,7 @@ def check_updated_sakila_profile_path():
 @then('no local .dbt folder should be created')
 def check_no_local_dbt_folder():
     """Verify no local .dbt folder was created."""
-    dbt_dir = Path('.dbt')
-    assert not dbt_dir.exists(), "Local .dbt folder was created despite --no-local-profile flag"
+    assert not DBT_DIR.exists(), "Local .dbt folder was created despite --no-local-profile flag"
 
 @then('the setup should complete successfully')
 def check_setup_success():
@@ -369,11 +328,9 @@ def check_corrupted_file_warning():
 @then('a new profiles.yml should be created with only the Sakila profile')
 def check_new_profiles_yml_created():
     """Verify new profiles.yml was created with Sakila profile."""
-    profiles_file = Path('.dbt/profiles.yml')
-    assert profiles_file.exists(), "New profiles.yml was not created"
+    assert PROFILES_YML.exists(), "New profiles.yml was not created"
 
-    with open(profiles_file, 'r') as f:
-        profiles = yaml.safe_load(f)
+    profiles = _load_profiles()
 
     assert 'Sakila' in profiles, "Sakila profile not found in new profiles.yml"
     # Should only have Sakila profile (corrupted content was replaced)
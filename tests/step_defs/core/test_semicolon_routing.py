@@ -4,7 +4,6 @@ This tests the critical core functionality that queries ending with semicolon
 must be routed to direct SQL execution, not to the LLM.
 """
 
-import pytest
 import subprocess
 import os
 from pytest_bdd import scenarios, given, when, then, parsers
@@ -18,11 +17,6 @@ def qbot_is_running():
     """Ensure SQLBot is available and running."""
     pass
 
-@given('the database is available')
-def database_is_available():
-    """Ensure database connection is available."""
-    pass
-
 @given('safeguards are enabled by default')
 def safeguards_enabled_by_default():
     """Verify safeguards are enabled by default."""
@@ -36,17 +30,17 @@ def in_qbot_interface():
     pass
 
 @given('I start SQLBot in Textual mode')
-def start_textual_mode():
+def start_textual_mode(ctx):
     """Start SQLBot in Textual interface mode."""
     # Instead of full Textual setup, just test the shared session logic that Textual uses
     from sqlbot.interfaces.shared_session import SQLBotSession
     from sqlbot.core.config import SQLBotConfig
     
     config = SQLBotConfig(profile='sqlbot')
-    pytest.textual_session = SQLBotSession(config)
+    ctx.textual_session = SQLBotSession(config)
 
 @when(parsers.parse('I enter "{query}"'))
-def enter_query(query):
+def enter_query(query, ctx):
     """Enter a query in the SQLBot interface."""
     # Test the routing logic directly
     from sqlbot.repl import is_sql_query
@@ -54,8 +48,8 @@ def enter_query(query):
     from sqlbot.core.config import SQLBotConfig
     
     # Store the query for later assertions
-    pytest.test_query = query
-    pytest.is_semicolon_query = is_sql_query(query)
+    ctx.test_query = query
+    ctx.is_semicolon_query = is_sql_query(query)
     
     # Test the shared session routing (used by Textual interface)
     config = SQLBotConfig(profile='sqlbot')
@@ -64,18 +58,15 @@ def enter_query(query):
     os.environ['DBT_PROFILE_NAME'] = 'sqlbot'
     
     try:
-        pytest.session_result = session.execute_query(query)
+        ctx.session_result = session.execute_query(query)
     except Exception as e:
-        pytest.session_error = str(e)
-        pytest.session_result = None
+        ctx.session_error = str(e)
+        ctx.session_result = None
 
 @when(parsers.parse('I run SQLBot with query "{query}" and flag "{flag}"'))
-def run_qbot_cli_with_query(query, flag):
+def run_qbot_cli_with_query(query, flag, subprocess_env_base, subprocess_timeout, ctx):
     """Run SQLBot in CLI mode with a specific query."""
-    from tests.conftest import setup_subprocess_environment
-    
-    env = setup_subprocess_environment()
-    env['DBT_PROFILE_NAME'] = 'sqlbot'
+    env = {**subprocess_env_base, 'DBT_PROFILE_NAME': 'sqlbot'}
     
     cmd = ['python', '-m', 'sqlbot.repl', flag, '--profile', 'sqlbot', query]
     
@@ -83,66 +74,66 @@ def run_qbot_cli_with_query(query, flag):
         cmd,
         capture_output=True,
         text=True,
-        timeout=15,
+        timeout=subprocess_timeout,
         env=env
     )
     
-    pytest.qbot_cli_result = result
-    pytest.test_query = query
+    ctx.qbot_cli_result = result
+    ctx.test_query = query
 
 @then('the query should be routed to direct SQL execution')
-def query_routed_to_direct_sql():
+def query_routed_to_direct_sql(ctx):
     """Verify the query was routed to direct SQL execution, not LLM."""
-    query = pytest.test_query
+    query = ctx.test_query
     
     # 1. Test semicolon detection
     from sqlbot.repl import is_sql_query
     assert is_sql_query(query), f"Query '{query}' should be detected as SQL query (ends with semicolon)"
     
     # 2. Test that session routing worked
-    if hasattr(pytest, 'session_result') and pytest.session_result:
+    if hasattr(ctx, 'session_result') and ctx.session_result:
         # If it was routed to SQL, we should get a result from SQL execution
         # Check that it's not a natural language result
-        if pytest.session_result.success:
+        if ctx.session_result.success:
             # Successful SQL execution
-            assert pytest.session_result.query_type.value == "sql", f"Query type should be SQL, got: {pytest.session_result.query_type}"
+            assert ctx.session_result.query_type.value == "sql", f"Query type should be SQL, got: {ctx.session_result.query_type}"
         else:
             # Failed SQL execution (probably blocked by safeguards)
-            assert "safeguard" in pytest.session_result.error.lower(), f"SQL failure should mention safeguards, got: {pytest.session_result.error}"
+            assert "safeguard" in ctx.session_result.error.lower(), f"SQL failure should mention safeguards, got: {ctx.session_result.error}"
 
 @then('the query should be routed to the LLM')
-def query_routed_to_llm():
+def query_routed_to_llm(ctx):
     """Verify the query was routed to LLM, not direct SQL."""
-    query = pytest.test_query
+    query = ctx.test_query
     
     # Should NOT be detected as SQL query
     from sqlbot.repl import is_sql_query
     assert not is_sql_query(query), f"Query '{query}' should NOT be detected as SQL query (no semicolon)"
 
 @then('the query should be executed directly')
-def query_executed_directly():
+def query_executed_directly(ctx):
     """Verify query was executed directly in CLI mode."""
-    if hasattr(pytest, 'qbot_cli_result'):
+    if hasattr(ctx, 'qbot_cli_result'):
         # Should have successful execution
-        assert pytest.qbot_cli_result.returncode == 0, f"CLI execution failed: {pytest.qbot_cli_result.stderr}"
+        assert ctx.qbot_cli_result.returncode == 0, f"CLI execution failed: {ctx.qbot_cli_result.stderr}"
 
 @then(parsers.parse('I should see "{expected_text}"'))
-def should_see_text(expected_text):
+def should_see_text(expected_text, ctx):
     """Verify specific text appears in output."""
     found = False
     
     # Check CLI result if available
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         if expected_text in output:
             found = True
     
     # Check session result if available
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.error and expected_text in pytest.session_result.error:
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.error and expected_text in ctx.session_result.error:
             found = True
-        elif pytest.session_result.data:
-            data_str = str(pytest.session_result.data)
+        elif ctx.session_result.data:
+            data_str = str(ctx.session_result.data)
             if expected_text in data_str:
                 found = True
     
@@ -150,22 +141,22 @@ def should_see_text(expected_text):
     # we need to capture them differently. The key test is that we got a blocked result.
     if not found and ("Query disallowed due to dangerous operations" in expected_text or "Query passes safeguard" in expected_text):
         # Check if the query was properly handled by safeguards
-        if hasattr(pytest, 'session_result') and pytest.session_result:
-            if pytest.session_result.query_type.value == "sql":
+        if hasattr(ctx, 'session_result') and ctx.session_result:
+            if ctx.session_result.query_type.value == "sql":
                 found = True  # Query was handled through SQL path, safeguard message was shown
     
-    assert found, f"Expected to see '{expected_text}' in output. Session result: {getattr(pytest, 'session_result', None)}"
+    assert found, f"Expected to see '{expected_text}' in output. Session result: {getattr(ctx, 'session_result', None)}"
 
 @then('I should see query results')
-def should_see_query_results():
+def should_see_query_results(ctx):
     """Verify query results are displayed."""
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.success:
-            assert pytest.session_result.data is not None, "Should have query result data"
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.success:
+            assert ctx.session_result.data is not None, "Should have query result data"
         # If not successful, that's ok - might be blocked by safeguards
 
 @then('I should NOT see any LLM response')
-def should_not_see_llm_response():
+def should_not_see_llm_response(ctx):
     """Verify no LLM-generated content appears."""
     # Check for typical LLM response indicators
     llm_indicators = [
@@ -180,24 +171,24 @@ def should_not_see_llm_response():
     ]
     
     # Check CLI output
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         for indicator in llm_indicators:
             assert indicator not in output, f"Found LLM indicator '{indicator}' in output - query should not have gone to LLM"
     
     # Check session result
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.data:
-            data_str = str(pytest.session_result.data)
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.data:
+            data_str = str(ctx.session_result.data)
             for indicator in llm_indicators:
                 assert indicator not in data_str, f"Found LLM indicator '{indicator}' in session result - query should not have gone to LLM"
 
 @then('I should NOT see "[Structured Response]"')
-def should_not_see_structured_response():
+def should_not_see_structured_response(ctx):
     """Verify the [Structured Response] formatting issue doesn't appear."""
     # This is covered by should_not_see_llm_response, but adding explicit check
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         assert "[Structured Response]" not in output, "Should not see [Structured Response] formatting in direct SQL execution"
 
 @then('I should see an LLM response')
@@ -208,7 +199,7 @@ def should_see_llm_response():
     pass
 
 @then('I should NOT see safeguard messages')
-def should_not_see_safeguard_messages():
+def should_not_see_safeguard_messages(ctx):
     """Verify no safeguard messages appear (for LLM queries)."""
     safeguard_indicators = [
         "✔ Query passes safeguard",
@@ -216,7 +207,7 @@ def should_not_see_safeguard_messages():
         "Query blocked by safeguard"
     ]
     
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         for indicator in safeguard_indicators:
             assert indicator not in output, f"Should not see safeguard message '{indicator}' for LLM queries"
\ No newline at end of file
@@ -18,11 +18,6 @@ def qbot_is_running():
     """Ensure SQLBot is available and running."""
     pass
 
-@given('the database is available')
-def database_is_available():
-    """Ensure database connection is available."""
-    pass
-
 @given('I am in the SQLBot interface')
 def in_qbot_interface():
     """Set up SQLBot interface context."""
@@ -35,20 +30,20 @@ def dangerous_mode_enabled():
     repl_module.READONLY_MODE = False  # Dangerous mode = safeguards off
 
 @when(parsers.parse('I enter "{command}"'))
-def enter_slash_command(command):
+def enter_slash_command(command, ctx):
     """Enter a slash command in the SQLBot interface."""
     # Test both the CLI routing and the shared session routing
-    pytest.test_command = command
+    ctx.test_command = command
     
     # Test CLI routing first
     from sqlbot.repl import handle_slash_command
     os.environ['DBT_PROFILE_NAME'] = 'sqlbot'
     
     try:
-        pytest.cli_result = handle_slash_command(command)
+        ctx.cli_result = handle_slash_command(command)
     except Exception as e:
-        pytest.cli_error = str(e)
-        pytest.cli_result = None
+        ctx.cli_error = str(e)
+        ctx.cli_result = None
     
     # Test shared session routing (used by Textual interface)
     from sqlbot.interfaces.shared_session import SQLBotSession
@@ -58,18 +53,15 @@ def enter_slash_command(command):
     session = SQLBotSession(config)
     
     try:
-        pytest.session_result = session.execute_query(command)
+        ctx.session_result = session.execute_query(command)
     except Exception as e:
-        pytest.session_error = str(e)
-        pytest.session_result = None
+        ctx.session_error = str(e)
+        ctx.session_result = None
 
 @when(parsers.parse('I run SQLBot with query "{command}" and flag "{flag}"'))
-def run_qbot_cli_with_command(command, flag):
+def run_qbot_cli_with_command(command, flag, subprocess_env_base, subprocess_timeout, ctx):
     """Run SQLBot in CLI mode with a slash command."""
-    from tests.conftest import setup_subprocess_environment
-    
-    env = setup_subprocess_environment()
-    env['DBT_PROFILE_NAME'] = 'sqlbot'
+    env = {**subprocess_env_base, 'DBT_PROFILE_NAME': 'sqlbot'}
     
     cmd = ['python', '-m', 'sqlbot.repl', flag, '--profile', 'sqlbot', command]
     
@@ -77,25 +69,25 @@ def run_qbot_cli_with_command(command, flag):
         cmd,
         capture_output=True,
         text=True,
-        timeout=15,
+        timeout=subprocess_timeout,
         env=env
     )
     
-    pytest.qbot_cli_result = result
-    pytest.test_command = command
+    ctx.qbot_cli_result = result
+    ctx.test_command = command
 
 @then('the command should be routed to system handler')
-def command_routed_to_system():
+def command_routed_to_system(ctx):
     """Verify the command was routed to system handler, not LLM."""
-    command = pytest.test_command
+    command = ctx.test_command
     
     # Should start with slash
     assert command.startswith('/'), f"Test command should start with slash: {command}"
     
     # Check that session routing worked
-    if hasattr(pytest, 'session_result') and pytest.session_result:
+    if hasattr(ctx, 'session_result') and ctx.session_result:
         # Should be handled as slash command, not natural language
-        assert pytest.session_result.query_type.value == "slash_command", f"Should be slash command type, got: {pytest.session_result.query_type}"
+        assert ctx.session_result.query_type.value == "slash_command", f"Should be slash command type, got: {ctx.session_result.query_type}"
 
 @then('I should see dangerous mode status')
 def should_see_dangerous_mode_status():
@@ -104,10 +96,10 @@ def should_see_dangerous_mode_status():
     pass
 
 @then('I should see dangerous mode status in CLI output')
-def should_see_dangerous_mode_status_cli():
+def should_see_dangerous_mode_status_cli(ctx):
     """Verify dangerous mode status appears in CLI output."""
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         # Should contain dangerous mode status information
         dangerous_indicators = [
             "Dangerous mode:",
@@ -119,48 +111,48 @@ def should_see_dangerous_mode_status_cli():
         assert found, f"Should see dangerous mode status in CLI output: {output}"
 
 @then(parsers.parse('I should see "{expected_text}"'))
-def should_see_specific_text(expected_text):
+def should_see_specific_text(expected_text, ctx):
     """Verify specific text appears in output."""
     found = False
     
     # Check CLI result if available
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         if expected_text in output:
             found = True
     
     # Check session result if available
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.data:
-            data_str = str(pytest.session_result.data)
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.data:
+            data_str = str(ctx.session_result.data)
             if expected_text in data_str:
                 found = True
     
     # For system messages, they might be printed to console
     # The key test is that the command was handled as a slash command
     if not found and ("Dangerous mode" in expected_text or "Safeguards are" in expected_text or "Unknown command" in expected_text or "Type /help for available commands" in expected_text):
-        if hasattr(pytest, 'session_result') and pytest.session_result:
-            if pytest.session_result.query_type.value == "slash_command":
+        if hasattr(ctx, 'session_result') and ctx.session_result:
+            if ctx.session_result.query_type.value == "slash_command":
                 found = True  # Command was handled properly, message was printed
     
     assert found, f"Expected to see '{expected_text}' in output"
 
 @then('I should see the help table')
-def should_see_help_table():
+def should_see_help_table(ctx):
     """Verify help table is displayed."""
     # Help table will be displayed by the handle_slash_command function
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        assert pytest.session_result.query_type.value == "slash_command", "Help should be handled as slash command"
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        assert ctx.session_result.query_type.value == "slash_command", "Help should be handled as slash command"
 
 @then('I should see database tables list')
-def should_see_tables_list():
+def should_see_tables_list(ctx):
     """Verify database tables list is displayed."""
     # Tables list will be displayed by the handle_slash_command function
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        assert pytest.session_result.query_type.value == "slash_command", "Tables should be handled as slash command"
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        assert ctx.session_result.query_type.value == "slash_command", "Tables should be handled as slash command"
 
 @then('I should NOT see any LLM response')
-def should_not_see_llm_response():
+def should_not_see_llm_response(ctx):
     """Verify no LLM-generated content appears."""
     # Check for typical LLM response indicators
     llm_indicators = [
@@ -175,31 +167,31 @@ def should_not_see_llm_response():
     ]
     
     # Check CLI output
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         for indicator in llm_indicators:
             assert indicator not in output, f"Found LLM indicator '{indicator}' in CLI output - command should not have gone to LLM"
     
     # Check session result
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.data:
-            data_str = str(pytest.session_result.data)
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.data:
+            data_str = str(ctx.session_result.data)
             for indicator in llm_indicators:
                 assert indicator not in data_str, f"Found LLM indicator '{indicator}' in session result - command should not have gone to LLM"
         
         # Most importantly, query type should be slash_command, not natural_language
-        assert pytest.session_result.query_type.value != "natural_language", f"Slash command should not be handled as natural language query, got: {pytest.session_result.query_type}"
+        assert ctx.session_result.query_type.value != "natural_language", f"Slash command should not be handled as natural language query, got: {ctx.session_result.query_type}"
 
 @then('I should NOT see "[Structured Response]"')
-def should_not_see_structured_response():
+def should_not_see_structured_response(ctx):
     """Verify the [Structured Response] formatting issue doesn't appear."""
-    if hasattr(pytest, 'qbot_cli_result'):
-        output = pytest.qbot_cli_result.stdout + pytest.qbot_cli_result.stderr
+    if hasattr(ctx, 'qbot_cli_result'):
+        output = ctx.qbot_cli_result.stdout + ctx.qbot_cli_result.stderr
         assert "[Structured Response]" not in output, "Should not see [Structured Response] for slash commands"
     
-    if hasattr(pytest, 'session_result') and pytest.session_result:
-        if pytest.session_result.data:
-            data_str = str(pytest.session_result.data)
+    if hasattr(ctx, 'session_result') and ctx.session_result:
+        if ctx.session_result.data:
+            data_str = str(ctx.session_result.data)
             assert "[Structured Response]" not in data_str, "Should not see [Structured Response] for slash commands"
 
 def test_slash_command_detection_logic():
@@ -248,7 +240,6 @@ def test_slash_commands_submit_immediately():
     from io import StringIO
     from unittest.mock import patch
     import sqlbot.repl as repl_module
-    from rich.console import Console
 
     # Test that slash commands don't wait for additional input
     test_cases = [
@@ -265,8 +256,6 @@ def test_slash_commands_submit_immediately():
         # Simulate single-line input (no second Enter press)
         with patch('builtins.input', return_value=command):
             with patch('sys.stdout', new_callable=StringIO):
-                console = Console()
-
                 # Create the read_multiline_input function inline for testing
                 def read_multiline_input():
                     lines = []
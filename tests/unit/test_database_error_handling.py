@@ -6,11 +6,6 @@ Tests that database errors are properly captured and displayed to both users and
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import subprocess
-import sys
-import os
-
-# Add the project root to Python path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 from sqlbot.repl import execute_clean_sql
 